@@ -15,7 +15,7 @@ setup(
 	package_dir={'':'src'},
     install_requires=[
         'numpy',
-        'scipy>=1.2.0',
+        'scipy>=1.4.0',
         'netcdf4',
         'datetime'
     ],
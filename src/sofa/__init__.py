@@ -22,13 +22,17 @@
 """
 __version__ = "0.2.0"
 
-__all__=["access", "conventions", "datatypes", "roomtypes", "spatial", "Database"]
+__all__=["access", "conventions", "datatypes", "roomtypes", "spatial", "convolution", "compaction", "concatenation", "concat", "Database"]
 
 from . import access
 from . import datatypes
 from . import spatial
 from . import roomtypes
 from . import conventions
+from . import convolution
+from . import compaction
+from . import concatenation
+from .concatenation import concat
 from ._database import Database
 
 #####################################
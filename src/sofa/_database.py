@@ -52,6 +52,11 @@ class Database(access.ProxyObject):
         self._Metadata = None
         self._Variables = None
 
+        self._Data = None
+        self._Room = None
+
+        self._spatial_cache = dict()
+
     @staticmethod
     def create(path, convention, dimensions=None):
         """Create a new .sofa file following a SOFA convention
@@ -130,6 +135,10 @@ class Database(access.ProxyObject):
 
         self._Metadata = None
 
+        self._Data = None
+        self._Room = None
+
+        self._spatial_cache.clear()
         return
 
     def save(self):
@@ -145,7 +154,8 @@ class Database(access.ProxyObject):
     @property
     def Data(self):
         """DataType specific access for the measurement data, see :mod:`sofa.datatypes`"""
-        return datatypes.get(self)
+        if self._Data is None: self._Data = datatypes.get(self)
+        return self._Data
 
     @property
     def Dimensions(self):
@@ -197,7 +207,13 @@ class Database(access.ProxyObject):
     @property
     def Room(self):
         """RoomType specific access for the room data, see :mod:`sofa.roomtypes`"""
-        return roomtypes.get(self)
+        if self._Room is None: self._Room = roomtypes.get(self)
+        return self._Room
+
+    def _reset_type_access(self, name):
+        """Discard the cached Data or Room access object after a change of DataType or RoomType"""
+        if name == "DataType": self._Data = None
+        if name == "RoomType": self._Room = None
 
     ## metadata
     @property
@@ -206,7 +222,7 @@ class Database(access.ProxyObject):
         if self.dataset is None:
             print("No dataset open!")
             return None
-        if self._Metadata is None: self._Metadata = access.Metadata(self.dataset)
+        if self._Metadata is None: self._Metadata = access.Metadata(self.dataset, self)
         return self._Metadata
 
     ## direct access to variables
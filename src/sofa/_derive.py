@@ -0,0 +1,185 @@
+# Copyright (c) 2019 Jannika Lossner
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""Helpers for writing databases derived from existing ones, block by block along dimension M.
+"""
+import numpy as np
+
+from . import access
+from . import conventions
+from ._database import Database
+
+# attributes set by Database.create or the convention of the derived database
+_convention_attributes = {"Conventions", "Version", "SOFAConventions", "SOFAConventionsVersion", "DataType",
+                          "DateCreated", "DateModified", "APIName", "APIVersion"}
+
+# attributes of quantised variables that do not apply to their decoded values
+_packing_attributes = {"scale_factor", "add_offset", access.scale_variable_attribute}
+
+# default amount of data copied at once
+_block_bytes = 1 << 26
+
+
+def create_derived(database, path, convention=None, dimensions=None, exclude=(), variable_dimensions=None,
+                   data_types=None, chunk_measurements=None, compressed=False):
+    """Create a new database with the dimensions, attributes and variable definitions of an existing database
+
+    Parameters
+    ----------
+    database : :class:`sofa.Database`
+        Source database
+    path : str
+        Relative or absolute path of the new .sofa file
+    convention : str, optional
+        Name of the SOFA convention of the new database, convention of the source database if not provided
+    dimensions : dict, optional
+        Dimension sizes replacing those of the source database
+    exclude : iterable of str, optional
+        Names of variables that are not defined in the new database
+    variable_dimensions : dict(key:str, value:tuple of str), optional
+        Dimensions replacing those of the source variables
+    data_types : dict(key:str, value:str), optional
+        Data types replacing those of the source variables
+    chunk_measurements : int, optional
+        Chunk size along dimension M of the new variables
+    compressed : bool, optional
+        Whether to compress the new variables with zlib
+
+    Returns
+    -------
+    derived : :class:`sofa.Database`
+        New database without any values copied, quantised source variables are defined with decoded values
+    """
+    if convention is None:
+        convention = database.Metadata.get_attribute("SOFAConventions")
+        if convention not in conventions.implemented(): convention = database.convention.name
+    sizes = {d: database.Dimensions.get_dimension(d) for d in database.Dimensions.list_dimensions()}
+    if dimensions is not None: sizes.update(dimensions)
+    derived = Database.create(path, convention, dimensions={d: v for d, v in sizes.items() if d not in ("I", "C")})
+
+    for attr in database.Metadata.list_attributes():
+        if attr in _convention_attributes: continue
+        derived.Metadata.set_attribute(attr, database.Metadata.get_attribute(attr))
+
+    if variable_dimensions is None: variable_dimensions = dict()
+    if data_types is None: data_types = dict()
+    scale_variables = [database.dataset[name].getncattr(access.scale_variable_attribute)
+                       for name in database.Variables.list_variables() if access.is_quantised(database.dataset[name])]
+    for name in database.Variables.list_variables():
+        if name in exclude or name in scale_variables: continue
+        source = database.dataset[name]
+        quantised = access.is_quantised(source)
+        dims = variable_dimensions.get(name, source.dimensions)
+        chunks = None
+        if chunk_measurements is not None and len(dims) and dims[0] == "M":
+            chunks = (min(chunk_measurements, sizes["M"]),) + tuple(sizes[d] for d in dims[1:])
+        fill_value = source.getncattr("_FillValue") if "_FillValue" in source.ncattrs() else None
+        data_type = data_types.get(name, "d" if quantised else source.datatype)
+        target = derived.dataset.createVariable(name, data_type, dims, fill_value=fill_value, chunksizes=chunks,
+                                                zlib=compressed)
+        for attr in source.ncattrs():
+            if attr == "_FillValue": continue
+            if quantised and attr in _packing_attributes: continue
+            target.setncattr(attr, source.getncattr(attr))
+    return derived
+
+
+def measurement_block_size(variable, block_bytes=None):
+    """Number of measurements of a variable that fit into the given number of bytes"""
+    if block_bytes is None: block_bytes = _block_bytes
+    axis = variable.dimensions.index("M") if "M" in variable.dimensions else 0
+    shape = variable.shape[:axis] + variable.shape[axis + 1:]
+    per_measurement = variable.dtype.itemsize * int(np.prod(shape, dtype=np.int64))
+    return max(1, block_bytes // max(per_measurement, 1))
+
+
+def measurement_selection(variable, measurements):
+    """Selection of measurements along dimension M, or I if not available, of a netCDF4 variable"""
+    axis = variable.dimensions.index("M" if "M" in variable.dimensions else "I")
+    return (slice(None),) * axis + (measurements,)
+
+
+def read_measurements(variable, measurements, indices=()):
+    """Read an arbitrary selection of measurements along the first axis of a netCDF4 variable
+
+    Parameters
+    ----------
+    variable : :class:`netCDF4.Variable`
+        Variable with dimension M first
+    measurements : np.ndarray
+        Measurement indices in requested order, may contain duplicates
+    indices : tuple, optional
+        Indices of the remaining dimensions
+
+    Returns
+    -------
+    values : np.ndarray
+        Values of the selected measurements
+    """
+    unique, inverse = np.unique(measurements, return_inverse=True)
+    if len(unique) == unique[-1] - unique[0] + 1:
+        selection = slice(unique[0], unique[-1] + 1)
+    else:
+        selection = unique
+    with access.dataset_lock:
+        values = access.read_selection(variable, (selection,) + tuple(indices))
+    return values[inverse]
+
+
+def copy_variables(database, derived, names=None, measurements=None, block_size=None):
+    """Copy variable values between databases, block by block along dimension M
+
+    Parameters
+    ----------
+    database : :class:`sofa.Database`
+        Source database
+    derived : :class:`sofa.Database`
+        Target database
+    names : iterable of str, optional
+        Names of the variables to copy, all variables defined in both databases if not provided
+    measurements : array_like, optional
+        Source measurement index for each measurement of the target database
+    block_size : int, optional
+        Number of measurements copied at once, determined from the variable size if not provided
+    """
+    if names is None:
+        names = [n for n in derived.Variables.list_variables() if n in database.Variables.list_variables()]
+    if measurements is not None: measurements = np.asarray(measurements)
+    for name in names:
+        source = database.dataset[name]
+        target = derived.dataset[name]
+        if "M" not in source.dimensions or source.dimensions.index("M") != 0:
+            if measurements is not None and "M" in source.dimensions:
+                raise ValueError("cannot select measurements of {0}, dimension M must be first".format(name))
+            with access.dataset_lock:
+                target[...] = access.read_selection(source, ...)
+            continue
+        count = target.shape[0]
+        size = block_size if block_size is not None else measurement_block_size(source)
+        for block in range(0, count, size):
+            stop = min(block + size, count)
+            if measurements is None:
+                with access.dataset_lock:
+                    values = access.read_selection(source, slice(block, stop))
+            else:
+                values = read_measurements(source, measurements[block:stop])
+            with access.dataset_lock:
+                target[block:stop] = values
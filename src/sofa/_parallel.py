@@ -0,0 +1,89 @@
+# Copyright (c) 2019 Jannika Lossner
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""Helpers for block-wise and parallel processing along a dimension.
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+def block_slices(start, stop, block_size):
+    """Split the range [start, stop) into slices of at most block_size elements"""
+    if block_size is None or block_size < 1: block_size = max(stop - start, 1)
+    return [slice(s, min(s + block_size, stop)) for s in range(start, stop, block_size)]
+
+
+def map_blocks(function, blocks, workers=None, processes=False):
+    """Apply function to each block and return the results in order
+
+    Parameters
+    ----------
+    function : callable
+        Function applied to each block, must be picklable if processes is True
+    blocks : list
+        Arguments for each function call
+    workers : int, optional
+        Number of worker threads or processes, executor default if not provided, 1 runs all blocks in the calling thread
+    processes : bool, optional
+        Whether to use a process pool instead of a thread pool
+
+    Returns
+    -------
+    results : list
+        Return values of the function calls
+    """
+    return list(imap_blocks(function, blocks, workers, processes))
+
+
+def imap_blocks(function, blocks, workers=None, processes=False, max_pending=None):
+    """Apply function to each block and yield the results in order as they become available
+
+    Parameters
+    ----------
+    function : callable
+        Function applied to each block, must be picklable if processes is True
+    blocks : iterable
+        Arguments for each function call, may be a generator producing them on demand
+    workers : int, optional
+        Number of worker threads or processes, executor default if not provided, 1 runs all blocks in the calling thread
+    processes : bool, optional
+        Whether to use a process pool instead of a thread pool
+    max_pending : int, optional
+        Maximum number of submitted blocks whose results have not been yielded, unbounded if not provided
+
+    Yields
+    ------
+    result
+        Return value of each function call
+    """
+    if workers == 1 or (hasattr(blocks, "__len__") and len(blocks) < 2):
+        for b in blocks: yield function(b)
+        return
+    executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with executor(max_workers=workers) as pool:
+        if max_pending is None:
+            yield from pool.map(function, blocks)
+            return
+        pending = deque()
+        for b in blocks:
+            pending.append(pool.submit(function, b))
+            if len(pending) >= max_pending: yield pending.popleft().result()
+        while pending: yield pending.popleft().result()
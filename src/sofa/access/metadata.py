@@ -23,8 +23,13 @@
 
 class Metadata:
     #    """Access the dataset metadata"""
-    def __init__(self, dataset):
+    def __init__(self, dataset, database=None):
         self.dataset = dataset
+        self.database = database
+
+    def _attribute_changed(self, name):
+        # DataType and RoomType select the access classes cached by the database
+        if self.database is not None and name in ["DataType", "RoomType"]: self.database._reset_type_access(name)
 
     def get_attribute(self, name):
         """Parameters
@@ -50,6 +55,7 @@ class Metadata:
         """
         if name not in self.dataset.ncattrs(): return self.create_attribute(name, value=value)
         self.dataset.setncattr(name, value)
+        self._attribute_changed(name)
 
     def create_attribute(self, name, value=""):
         """Parameters
@@ -65,6 +71,7 @@ class Metadata:
             return
         self.dataset.NewSOFAAttribute = value
         self.dataset.renameAttribute("NewSOFAAttribute", name)
+        self._attribute_changed(name)
 
     def list_attributes(self):
         """Returns
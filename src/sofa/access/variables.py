@@ -24,6 +24,16 @@
 #__all__ = ["get_values_from_array", "DatasetVariables", "StringArray", "Variable"]
 
 import numpy as np
+import threading
+
+# netCDF4/HDF5 calls are not thread-safe, all dataset access from worker threads is serialized with this lock
+dataset_lock = threading.RLock()
+
+# amount of data read at once in the stored data type when converting values while reading
+_read_block_bytes = 1 << 24
+
+# attribute of quantised variables naming the variable of their scale factors
+scale_variable_attribute = "ScaleVariable"
 
 
 def filled_if_masked(array):
@@ -31,6 +41,40 @@ def filled_if_masked(array):
     return array
 
 
+def is_quantised(matrix):
+    """Whether a netCDF4 variable stores quantised values with scale factors in another variable"""
+    return scale_variable_attribute in matrix.ncattrs()
+
+
+def read_selection(matrix, selection):
+    """Read values of a netCDF4 variable, filled if masked and multiplied with the scale factors of quantised
+    variables
+
+    The scale factor variable spans the leading dimensions of the quantised variable, e.g. ("M",) or ("M", "R"),
+    the values themselves are unpacked to [-1, 1] by their scale_factor attribute.
+
+    Parameters
+    ----------
+    matrix : :class:`netCDF4.Variable`
+        Variable to read from
+    selection : tuple
+        Index of each dimension
+
+    Returns
+    -------
+    values : np.ndarray
+        Values in the order of the variable dimensions, without integer-indexed dimensions
+    """
+    if not isinstance(selection, tuple): selection = (selection,)
+    values = filled_if_masked(matrix[selection])
+    if not is_quantised(matrix): return values
+    scales = matrix.group()[matrix.getncattr(scale_variable_attribute)]
+    selection = selection + (slice(None),) * (matrix.ndim - len(selection))
+    factors = filled_if_masked(scales[selection[:scales.ndim]])
+    trailing = sum(1 for sl in selection[scales.ndim:] if not is_integer(sl))
+    return values * np.reshape(factors, np.shape(factors) + (1,) * trailing)
+
+
 def is_integer(val):
     return np.issubdtype(type(val), np.integer)
 
@@ -186,7 +230,7 @@ class _VariableBase:
         if dim == "M" and "I" in self.dimensions(): return self.dimensions().index("I")
         return None
 
-    def get_values(self, indices=None, dim_order=None):
+    def get_values(self, indices=None, dim_order=None, dtype=None, out=None):
         """
         Parameters
         ----------
@@ -194,6 +238,10 @@ class _VariableBase:
             Key: dimension name, value: indices to be returned, complete axis assumed if not provided
         dim_order : tuple of str, optional
             Desired order of dimensions in the output array
+        dtype : np.dtype, optional
+            Data type of the output array, converted block by block while reading, stored type if not provided
+        out : np.ndarray, optional
+            Preallocated output array, values are converted to its data type block by block while reading
 
         Returns
         -------
@@ -202,7 +250,47 @@ class _VariableBase:
         """
         if not self.exists():
             raise Exception("failed to get values of {0}, variable not initialized".format(self.name))
-        return get_values_from_array(self._Matrix, self.dimensions(), indices=indices, dim_order=dim_order)
+        if out is not None or (dtype is not None and np.dtype(dtype) != self._Matrix.dtype) or \
+                is_quantised(self._Matrix):
+            return self._read_converted(indices, dim_order, dtype, out)
+        with dataset_lock:
+            return get_values_from_array(self._Matrix, self.dimensions(), indices=indices, dim_order=dim_order)
+
+    def _read_converted(self, indices, dim_order, dtype, out):
+        """Read into an output array of another data type in blocks along the first sliced dimension, so that only
+        one block is held in the stored data type, decoding quantised values"""
+        matrix = self._Matrix
+        dimensions = self.dimensions()
+        indices = None if indices is None else dict(indices)
+        sls = get_slice_tuple(dimensions, indices)
+        default_order = get_default_dimension_order(dimensions, indices)
+        if dim_order is None: dim_order = default_order
+        transposition = get_dimension_order_transposition(default_order, dim_order)
+
+        kept = [i for i, sl in enumerate(sls) if not is_integer(sl)]
+        shape = [len(range(*sls[i].indices(matrix.shape[i]))) if isinstance(sls[i], slice) else len(sls[i])
+                 for i in kept]
+        if dtype is None: dtype = np.float64 if is_quantised(matrix) else matrix.dtype
+        if out is None: out = np.empty([shape[t] for t in transposition], dtype=dtype)
+
+        # block along the first contiguous slice
+        sliced = [k for k, i in enumerate(kept) if isinstance(sls[i], slice) and sls[i].indices(matrix.shape[i])[2] == 1]
+        if not sliced:
+            with dataset_lock:
+                out[...] = np.transpose(read_selection(matrix, sls), transposition)
+            return out
+        position = sliced[0]
+        axis, out_axis = kept[position], transposition.index(position)
+        start = sls[axis].indices(matrix.shape[axis])[0]
+        row_bytes = matrix.dtype.itemsize * int(np.prod(shape, dtype=np.int64)) // max(shape[position], 1)
+        rows = max(1, _read_block_bytes // max(row_bytes, 1))
+        for offset in range(0, shape[position], rows):
+            count = min(rows, shape[position] - offset)
+            block = sls[:axis] + (slice(start + offset, start + offset + count),) + sls[axis + 1:]
+            with dataset_lock:
+                values = read_selection(matrix, block)
+            out[(slice(None),) * out_axis + (slice(offset, offset + count),)] = np.transpose(values, transposition)
+        return out
 
     def _reorder_values_for_set(self, values, indices=None, dim_order=None, repeat_dim=None):
         """
@@ -296,10 +384,13 @@ class _VariableBase:
         """
         if not self.exists():
             raise Exception("failed to set values of {0}, variable not initialized".format(self.name))
+        if is_quantised(self._Matrix):
+            raise Exception("failed to set values of {0}, variable is quantised".format(self.name))
         new_values, sls = self._reorder_values_for_set(values, indices, dim_order, repeat_dim)
 
         # assign
-        self._Matrix[sls] = new_values
+        with dataset_lock:
+            self._Matrix[sls] = new_values
         return
 
 class Variable(_VariableBase):
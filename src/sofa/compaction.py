@@ -0,0 +1,125 @@
+# Copyright (c) 2019 Jannika Lossner
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""Compaction of databases by storing variables that are constant along dimension M with dimension I.
+"""
+import numpy as np
+
+from . import access
+from . import _derive
+
+
+def constant_variables(database, names=None, tolerance=0, block_size=None):
+    """Variables of a database whose values are identical for all measurements, found by streaming over blocks of
+    measurements
+
+    Parameters
+    ----------
+    database : :class:`sofa.Database`
+        Source database
+    names : iterable of str, optional
+        Names of the variables to test, all variables with dimension M and without dimension N if not provided
+    tolerance : float, optional
+        Largest absolute difference to the values of the first measurement considered identical
+    block_size : int, optional
+        Number of measurements read at once, determined from the variable size if not provided
+
+    Returns
+    -------
+    names : list of str
+        Names of the constant variables
+    """
+    if names is None:
+        names = [n for n in database.Variables.list_variables()
+                 if "M" in database.dataset[n].dimensions and "N" not in database.dataset[n].dimensions]
+    M = database.Dimensions.M
+    constant = []
+    for name in names:
+        source = database.dataset[name]
+        if "M" not in source.dimensions: raise ValueError("cannot compact {0}, no dimension M".format(name))
+        size = block_size if block_size is not None else _derive.measurement_block_size(source)
+        with access.dataset_lock:
+            first = access.read_selection(source, _derive.measurement_selection(source, slice(0, 1)))
+        for block in range(0, M, size):
+            selection = _derive.measurement_selection(source, slice(block, min(block + size, M)))
+            with access.dataset_lock:
+                values = access.read_selection(source, selection)
+            if np.issubdtype(values.dtype, np.number):
+                identical = np.all(np.abs(values - first) <= tolerance)
+            else:
+                identical = np.all(values == first)
+            if not identical: break
+        else:
+            constant.append(name)
+    return constant
+
+
+def compact(database, path, names=None, tolerance=0, block_size=None):
+    """Write a new database with the variables that are constant along dimension M stored with dimension I
+
+    Parameters
+    ----------
+    database : :class:`sofa.Database`
+        Source database
+    path : str
+        Relative or absolute path of the new .sofa file
+    names : iterable of str, optional
+        Names of the variables to compact if constant, all variables with dimension M and without dimension N if not
+        provided
+    tolerance : float, optional
+        Largest absolute difference to the values of the first measurement considered identical
+    block_size : int, optional
+        Number of measurements read at once, determined from the variable size if not provided
+
+    Returns
+    -------
+    compacted : :class:`sofa.Database`
+        New database
+    report : dict
+        "variables" (names of the compacted variables), "data_bytes" and "compacted_data_bytes" (uncompressed size
+        of all variables), "saved_bytes"
+    """
+    constant = constant_variables(database, names, tolerance, block_size)
+    compacted = _derive.create_derived(database, path, variable_dimensions={
+        name: tuple("I" if d == "M" else d for d in database.dataset[name].dimensions) for name in constant})
+    _derive.copy_variables(database, compacted, [n for n in compacted.Variables.list_variables()
+                                                 if n not in constant], block_size=block_size)
+    for name in constant:
+        with access.dataset_lock:
+            source = database.dataset[name]
+            first = access.read_selection(source, _derive.measurement_selection(source, slice(0, 1)))
+            compacted.dataset[name][...] = first
+    if len(constant):
+        history = database.Metadata.get_attribute("History")
+        compacted.Metadata.set_attribute("History", (history + "\n" if history else "") +
+                                         "constant along M stored with dimension I: {0}".format(", ".join(constant)))
+
+    def size(dataset):
+        return sum(v.dtype.itemsize * int(np.prod(v.shape, dtype=np.int64)) for v in dataset.variables.values())
+
+    data_bytes, compacted_data_bytes = size(database.dataset), size(compacted.dataset)
+    report = {
+        "variables": constant,
+        "data_bytes": data_bytes,
+        "compacted_data_bytes": compacted_data_bytes,
+        "saved_bytes": data_bytes - compacted_data_bytes,
+    }
+    return compacted, report
@@ -0,0 +1,151 @@
+# Copyright (c) 2019 Jannika Lossner
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""Concatenation of databases of the same convention along dimension M.
+"""
+import os
+
+import numpy as np
+
+from . import access
+from . import _derive
+from . import _parallel
+from ._database import Database
+
+# attributes that may differ between concatenated variables
+_ignored_attributes = {"_FillValue"} | _derive._packing_attributes
+
+
+def _check_compatible(databases, names):
+    """Raise if the databases differ in convention, data type, dimensions other than M or variable definitions"""
+    first = databases[0]
+    for attr in ["SOFAConventions", "DataType", "RoomType"]:
+        values = set(db.Metadata.get_attribute(attr) for db in databases)
+        if len(values) > 1: raise ValueError("cannot concatenate databases of different {0}: {1}".format(attr, values))
+    sizes = {d: first.Dimensions.get_dimension(d) for d in first.Dimensions.list_dimensions() if d != "M"}
+    for db in databases[1:]:
+        other = {d: db.Dimensions.get_dimension(d) for d in db.Dimensions.list_dimensions() if d != "M"}
+        if other != sizes: raise ValueError("cannot concatenate databases of different dimensions: {0}, {1}".format(
+            sizes, other))
+    for name in names:
+        source = first.dataset[name]
+        dimensions = tuple("M" if d == "I" else d for d in source.dimensions)
+        attributes = {a: source.getncattr(a) for a in source.ncattrs() if a not in _ignored_attributes}
+        for db in databases[1:]:
+            if name not in db.dataset.variables:
+                raise ValueError("cannot concatenate databases, {0} missing in {1}".format(name, db.dataset.filepath()))
+            other = db.dataset[name]
+            if tuple("M" if d == "I" else d for d in other.dimensions) != dimensions:
+                raise ValueError("cannot concatenate {0} of dimensions {1} and {2}".format(
+                    name, source.dimensions, other.dimensions))
+            if {a: other.getncattr(a) for a in other.ncattrs() if a not in _ignored_attributes} != attributes:
+                raise ValueError("cannot concatenate {0} with different attributes".format(name))
+
+
+def _identical(databases, name):
+    """Whether a variable has the same values in all databases"""
+    with access.dataset_lock:
+        first = access.read_selection(databases[0].dataset[name], ...)
+        return all(np.array_equal(first, access.read_selection(db.dataset[name], ...)) for db in databases[1:])
+
+
+def concat(paths, out_path, block_size=None, workers=None):
+    """Concatenate databases of the same convention along dimension M into a new database
+
+    Variables with dimension M are copied block by block. Variables with dimension I keep it if they are identical in
+    all databases and are otherwise written with dimension M, repeating the values of the databases storing them with
+    dimension I. Variables without dimension M or I must be identical in all databases.
+
+    Parameters
+    ----------
+    paths : list of str
+        Relative or absolute paths of the .sofa files, in the order of their measurements in the new database
+    out_path : str
+        Relative or absolute path of the new .sofa file
+    block_size : int, optional
+        Number of measurements copied at once, determined from the variable size if not provided
+    workers : int, optional
+        Number of worker threads copying the databases in parallel, 1 copies them in order in the calling thread
+
+    Returns
+    -------
+    concatenated : :class:`sofa.Database`
+        New database
+    """
+    if not len(paths): raise ValueError("no databases to concatenate")
+    databases = [Database.open(path) for path in paths]
+    try:
+        first = databases[0]
+        scale_variables = set()
+        for db in databases:
+            scale_variables.update(db.dataset[n].getncattr(access.scale_variable_attribute)
+                                   for n in db.Variables.list_variables() if access.is_quantised(db.dataset[n]))
+        names = [n for n in first.Variables.list_variables() if n not in scale_variables]
+        _check_compatible(databases, names)
+
+        measured = []
+        for name in names:
+            if any("M" in db.dataset[name].dimensions for db in databases):
+                measured.append(name)
+            elif "I" in first.dataset[name].dimensions:
+                if not _identical(databases, name): measured.append(name)
+            elif not _identical(databases, name):
+                raise ValueError("cannot concatenate {0}, values differ between databases".format(name))
+
+        counts = [db.Dimensions.M for db in databases]
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        existed = os.path.exists(out_path)
+        concatenated = None
+        try:
+            concatenated = _derive.create_derived(first, out_path, dimensions={"M": int(offsets[-1])},
+                                                  variable_dimensions={n: tuple("M" if d == "I" else d for d in
+                                                                                first.dataset[n].dimensions)
+                                                                       for n in measured})
+            _derive.copy_variables(first, concatenated, [n for n in names if n not in measured])
+            history = first.Metadata.get_attribute("History")
+            concatenated.Metadata.set_attribute("History", (history + "\n" if history else "") +
+                                                "concatenated from {0}".format(", ".join(paths)))
+
+            def copy(index):
+                database, offset = databases[index], offsets[index]
+                for name in measured:
+                    source = database.dataset[name]
+                    target = concatenated.dataset[name]
+                    size = block_size if block_size is not None else _derive.measurement_block_size(source)
+                    for block in _parallel.block_slices(0, counts[index], size):
+                        selection = block if "M" in source.dimensions else slice(0, 1)
+                        with access.dataset_lock:
+                            values = access.read_selection(source, _derive.measurement_selection(source, selection))
+                        if "M" not in source.dimensions:
+                            values = np.repeat(values, block.stop - block.start, axis=source.dimensions.index("I"))
+                        selection = _derive.measurement_selection(target, slice(offset + block.start,
+                                                                               offset + block.stop))
+                        with access.dataset_lock:
+                            target[selection] = values
+
+            _parallel.map_blocks(copy, list(range(len(databases))), workers)
+        except BaseException:  # remove the incomplete database if this call created or overwrote it
+            if concatenated is not None: concatenated.close()
+            if (concatenated is not None or not existed) and os.path.exists(out_path): os.remove(out_path)
+            raise
+    finally:
+        for db in databases: db.close()
+    return concatenated
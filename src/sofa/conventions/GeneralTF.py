@@ -32,5 +32,5 @@ class GeneralTF(_Base):
         database.Metadata.set_attribute("SOFAConventions", self.name)
         database.Metadata.set_attribute("SOFAConventionsVersion", self.version)
 
-        database.Data.Type = "FIR"
+        database.Data.Type = "TF"
         return
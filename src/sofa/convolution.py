@@ -0,0 +1,322 @@
+# Copyright (c) 2019 Jannika Lossner
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""Uniformly partitioned overlap-save convolution of audio blocks with the impulse responses of a database.
+"""
+import hashlib
+import inspect
+import json
+import os
+
+import numpy as np
+
+from . import access
+
+# numpy >= 2.0 transforms directly into preallocated arrays
+_fft_out = "out" in inspect.signature(np.fft.rfft).parameters
+
+
+def _rfft(values, out):
+    if _fft_out: return np.fft.rfft(values, axis=-1, out=out)
+    out[...] = np.fft.rfft(values, axis=-1)
+    return out
+
+
+def _irfft(values, n, out):
+    if _fft_out: return np.fft.irfft(values, n=n, axis=-1, out=out)
+    out[...] = np.fft.irfft(values, n=n, axis=-1)
+    return out
+
+
+class Convolver:
+    """Block convolution of multiple audio sources with impulse responses of a FIR or FIRE database
+
+    The impulse responses of the selected measurements are split into partitions of the block size and held in the
+    frequency domain. Each source is convolved with the impulse responses of one measurement for all receivers, and
+    the results are summed into one output block per receiver. When the measurement of a source changes, the output
+    is crossfaded from the previous to the new impulse responses over one block. All buffers are allocated on
+    construction, so that :meth:`process` does not allocate with numpy >= 2.0.
+
+    Parameters
+    ----------
+    database : :class:`sofa.Database`
+        Database of DataType FIR or FIRE
+    block_size : int
+        Number of samples per audio block
+    source_count : int, optional
+        Number of sources convolved simultaneously
+    measurements : array_like, optional
+        Indices of the measurements to preload, all measurements if not provided
+    emitter : int, optional
+        Emitter whose impulse responses are used for FIRE data
+    sidecar : bool, optional
+        Whether to load the filter spectra from a sidecar file, see :func:`load_partition_spectra`
+    sidecar_directory : str, optional
+        Directory of the sidecar file, directory of the .sofa file if not provided
+    """
+
+    def __init__(self, database, block_size, source_count=1, measurements=None, emitter=0, sidecar=False,
+                 sidecar_directory=None):
+        M = database.Dimensions.M
+        if measurements is None: measurements = np.arange(M)
+        measurements = np.atleast_1d(np.asarray(measurements, dtype=int))
+
+        # partitioned filter spectra (filters, partitions, R, bins)
+        if sidecar:
+            spectra = load_partition_spectra(database, block_size, emitter, sidecar_directory)
+            self._spectra = spectra if len(measurements) == M and np.all(measurements == np.arange(M)) else \
+                spectra[measurements]
+        else:
+            self._spectra = partition_spectra(database, block_size, measurements, emitter)
+
+        self._block_size = block_size
+        self._source_count = source_count
+        self._partition_count, self._receiver_count = self._spectra.shape[1:3]
+        bins = block_size + 1
+
+        self._filter_index = np.full(M, -1)
+        self._filter_index[measurements] = np.arange(len(measurements))
+
+        # per source state: filter spectra in use (-1 and silent until selected), frequency-domain delay line, input
+        # buffer
+        self._filters = np.full(source_count, -1)
+        self._source_spectra = np.zeros((source_count,) + self._spectra.shape[1:], dtype=self._spectra.dtype)
+        self._delay_line = np.zeros((source_count, self._partition_count, bins), dtype=complex)
+        self._head = 0
+        self._inputs = np.zeros((source_count, 2 * block_size))
+        self._previous = np.full(source_count, -1)
+        self._switched = False
+
+        # scratch buffers of the processing path
+        self._products = np.zeros((source_count, self._receiver_count, bins), dtype=complex)
+        self._accumulated = np.zeros((source_count, self._receiver_count, bins), dtype=complex)
+        self._mix = np.zeros((self._receiver_count, bins), dtype=complex)
+        self._fade_spectrum = np.zeros((self._receiver_count, bins), dtype=complex)
+        self._fade_products = np.zeros((self._receiver_count, bins), dtype=complex)
+        self._time = np.zeros((self._receiver_count, 2 * block_size))
+        self._fade_out = 0.5 + 0.5 * np.cos(np.pi * (np.arange(block_size) + 0.5) / block_size)
+
+    @property
+    def block_size(self):
+        """Number of samples per audio block"""
+        return self._block_size
+
+    @property
+    def source_count(self):
+        """Number of sources"""
+        return self._source_count
+
+    @property
+    def receiver_count(self):
+        """Number of output channels"""
+        return self._receiver_count
+
+    @property
+    def partition_count(self):
+        """Number of filter partitions"""
+        return self._partition_count
+
+    def set_measurements(self, measurements):
+        """Select the measurement of each source, changes are crossfaded during the next processed block
+
+        The first selection of a source applies without crossfade.
+
+        Parameters
+        ----------
+        measurements : array_like
+            Measurement index for each source, must be preloaded
+        """
+        filters = self._filter_index[measurements]
+        if np.any(filters < 0): raise ValueError("measurements {0} not preloaded".format(
+            np.asarray(measurements)[filters < 0]))
+        for s in np.flatnonzero(filters != self._filters):
+            if self._filters[s] >= 0:
+                if self._previous[s] < 0: self._previous[s] = self._filters[s]
+                self._switched = True
+            self._source_spectra[s] = self._spectra[filters[s]]
+        self._filters[...] = filters
+
+    def reset(self):
+        """Clear the input history of all sources"""
+        self._delay_line[...] = 0
+        self._inputs[...] = 0
+        self._previous[...] = -1
+        self._switched = False
+
+    def process(self, blocks, out=None):
+        """Convolve one block of each source and sum the results for each receiver
+
+        Parameters
+        ----------
+        blocks : np.ndarray
+            Audio blocks, dimensions (sources, block size)
+        out : np.ndarray, optional
+            Preallocated output array, dimensions (receivers, block size)
+
+        Returns
+        -------
+        output : np.ndarray
+            Output blocks, dimensions (receivers, block size)
+        """
+        B, P = self._block_size, self._partition_count
+        if out is None: out = np.empty((self._receiver_count, B))
+
+        # slide the input buffers and add the newest input spectrum to the delay lines
+        self._inputs[:, :B] = self._inputs[:, B:]
+        self._inputs[:, B:] = blocks
+        self._head = (self._head - 1) % P
+        _rfft(self._inputs, self._delay_line[:, self._head])
+
+        # delay line slot (head + p) % P holds the input spectrum for partition p
+        newest, oldest = self._delay_line[:, self._head:], self._delay_line[:, :self._head]
+        np.einsum("spk,sprk->srk", newest, self._source_spectra[:, :P - self._head], out=self._accumulated)
+        if self._head:
+            np.einsum("spk,sprk->srk", oldest, self._source_spectra[:, P - self._head:], out=self._products)
+            self._accumulated += self._products
+        np.sum(self._accumulated, axis=0, out=self._mix)
+        _irfft(self._mix, 2 * B, self._time)
+        out[...] = self._time[:, B:]
+
+        if not self._switched: return out
+
+        # crossfade from the previous filters of sources that switched measurements
+        for s in np.flatnonzero(self._previous >= 0):
+            spectra = self._spectra[self._previous[s]]
+            np.einsum("pk,prk->rk", newest[s], spectra[:P - self._head], out=self._fade_spectrum)
+            if self._head:
+                np.einsum("pk,prk->rk", oldest[s], spectra[P - self._head:], out=self._fade_products)
+                self._fade_spectrum += self._fade_products
+            self._fade_spectrum -= self._accumulated[s]
+            _irfft(self._fade_spectrum, 2 * B, self._time)
+            self._time[:, B:] *= self._fade_out
+            out += self._time[:, B:]
+            self._previous[s] = -1
+        self._switched = False
+        return out
+
+
+def partition_spectra(database, block_size, measurements=None, emitter=0):
+    """Spectra of the impulse responses split into partitions of the block size, zero-padded to twice the block size
+
+    Parameters
+    ----------
+    database : :class:`sofa.Database`
+        Database of DataType FIR or FIRE
+    block_size : int
+        Number of samples per partition
+    measurements : array_like, optional
+        Indices of the measurements, all measurements if not provided
+    emitter : int, optional
+        Emitter whose impulse responses are used for FIRE data
+
+    Returns
+    -------
+    spectra : np.ndarray
+        Complex spectra including Data.Delay rounded to full samples, dimensions (measurements, partitions, R,
+        block size + 1)
+    """
+    from . import _derive
+
+    ir = database.Data.IR
+    if ir.dimensions() not in [("M", "R", "N"), ("M", "R", "E", "N")]:
+        raise Exception("cannot convolve with DataType {0}".format(database.DataType))
+    M = database.Dimensions.M
+    if measurements is None: measurements = np.arange(M)
+    measurements = np.atleast_1d(np.asarray(measurements, dtype=int))
+
+    # impulse responses (filters, R, N) including the broadband delay rounded to full samples
+    emitter_index = (slice(None), emitter) if "E" in ir.dimensions() else ()
+    irs = _derive.read_measurements(database.dataset[ir.name], measurements, emitter_index)
+    delays = database.Data.Delay.get_values(indices={"E": emitter} if "E" in ir.dimensions() else None,
+                                            dim_order=("M", "R"))
+    delays = np.rint(np.broadcast_to(delays, (M, irs.shape[1]))[measurements]).astype(int)
+    length = irs.shape[-1] + max(delays.max(), 0)
+    partition_count = max(-(-length // block_size), 1)
+    receiver_count = irs.shape[1]
+
+    padded = np.zeros((len(measurements), receiver_count, partition_count * block_size))
+    for i, (values, delay) in enumerate(zip(irs, delays)):
+        for r in range(receiver_count):
+            padded[i, r, delay[r]:delay[r] + values.shape[-1]] = values[r]
+    partitions = padded.reshape(len(measurements), receiver_count, partition_count, block_size)
+    return np.fft.rfft(np.moveaxis(partitions, 2, 1), n=2 * block_size, axis=-1)
+
+
+def _checksum(database):
+    """SHA-1 of the values of Data.IR and Data.Delay, hashed block by block along M"""
+    from . import _derive
+
+    checksum = hashlib.sha1()
+    for variable in [database.Data.IR, database.Data.Delay]:
+        source = database.dataset[variable.name]
+        size = _derive.measurement_block_size(source)
+        for block in range(0, source.shape[0], size):
+            with access.dataset_lock:
+                values = access.read_selection(source, slice(block, block + size))
+            checksum.update(np.ascontiguousarray(values).tobytes())
+    return checksum.hexdigest()
+
+
+def load_partition_spectra(database, block_size, emitter=0, directory=None):
+    """Partition spectra of all measurements, memory-mapped from a sidecar file that is written on first use
+
+    The sidecar is a .npy file next to a .json fingerprint of the .sofa file (path, size, modification time and a
+    checksum of Data.IR and Data.Delay), block size and emitter. It is recomputed when the fingerprint does not match,
+    e.g. after Data.IR was modified, also by a same-size rewrite or within the current session.
+
+    Parameters
+    ----------
+    database : :class:`sofa.Database`
+        Database of DataType FIR or FIRE
+    block_size : int
+        Number of samples per partition
+    emitter : int, optional
+        Emitter whose impulse responses are used for FIRE data
+    directory : str, optional
+        Directory of the sidecar file, directory of the .sofa file if not provided
+
+    Returns
+    -------
+    spectra : np.memmap
+        Read-only spectra, see :func:`partition_spectra`
+    """
+    path = os.path.abspath(database.dataset.filepath())
+    if directory is None: directory = os.path.dirname(path)
+    stem = os.path.join(directory, "{0}.spectra-{1}-{2}".format(os.path.basename(path), block_size, emitter))
+    with access.dataset_lock:
+        database.dataset.sync()  # flush buffered modifications before fingerprinting the file
+    status = os.stat(path)
+    fingerprint = {"path": path, "size": status.st_size, "modified": status.st_mtime_ns,
+                   "checksum": _checksum(database), "block_size": block_size, "emitter": emitter}
+
+    try:
+        with open(stem + ".json") as f:
+            if json.load(f) == fingerprint: return np.load(stem + ".npy", mmap_mode="r")
+    except (OSError, ValueError):
+        pass
+
+    # write to temporary files first, so that concurrent workers never load partial sidecars
+    spectra = partition_spectra(database, block_size, emitter=emitter)
+    os.makedirs(directory, exist_ok=True)
+    suffix = ".{0}.tmp".format(os.getpid())
+    with open(stem + ".npy" + suffix, "wb") as f: np.save(f, spectra)
+    with open(stem + ".json" + suffix, "w") as f: json.dump(fingerprint, f)
+    os.replace(stem + ".npy" + suffix, stem + ".npy")
+    os.replace(stem + ".json" + suffix, stem + ".json")
+    return np.load(stem + ".npy", mmap_mode="r")
@@ -18,9 +18,9 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
-from .base import _Base
+from .impulseresponse import _ImpulseResponseBase
 
-class FIR(_Base):
+class FIR(_ImpulseResponseBase):
     """Finite Impulse Response data type
 
     IR : `sofa.access.Variable`
@@ -18,9 +18,9 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
-from .base import _Base
+from .impulseresponse import _ImpulseResponseBase
 
-class FIRE(_Base):
+class FIRE(_ImpulseResponseBase):
     """Finite Impulse Response per Emitter data type
 
     IR : `sofa.access.Variable`
@@ -18,7 +18,10 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
+import numpy as np
+
 from .base import _Base
+from .. import access
 
 
 class SOS(_Base):
@@ -34,11 +37,147 @@ class SOS(_Base):
 
     def __init__(self, database):
         super().__init__(database)
-        self.standard_dimensions["IR"] = [("M", "R", "N")]
+        self.standard_dimensions["SOS"] = [("M", "R", "N")]
         self.standard_dimensions["Delay"] = [("M", "R")]
         self.standard_dimensions["SamplingRate"] = [("I",), ("M",)]
 
-    def initialize(self, sample_count=None, variances=[], string_length=None):
-        if sample_count % 6 != 0: raise Exception(
+    def initialize(self, sample_count=None, variances=[], string_length=None, data_types=None):
+        if sample_count is None and "N" in self.database.Dimensions.list_dimensions():
+            sample_count = self.database.Dimensions.N
+        if sample_count is None or sample_count % 6 != 0: raise Exception(
             "Cannot initialize SOS DataType with dimension 'N'={0}, must be multiple of 6!".format(sample_count))
-        super().initialize(sample_count, variances, string_length)
+        super().initialize(sample_count, variances, string_length, data_types)
+
+    def get_cascades(self, indices=None):
+        """Second order sections as cascades of [b0, b1, b2, a0, a1, a2] coefficients
+
+        Parameters
+        ----------
+        indices : dict(key:str, value:int or slice), optional
+            Key: dimension name ("M" or "R"), value: indices to be returned, complete axis assumed if not provided
+
+        Returns
+        -------
+        cascades : np.ndarray
+            Coefficients, dimensions ("M", "R", sections, 6) without integer-indexed dimensions
+        """
+        if indices is not None and "N" in indices: raise ValueError("cannot select part of the second order sections")
+        dim_order = access.get_default_dimension_order(self.SOS.dimensions(), indices)
+        values = self.SOS.get_values(indices, dim_order=dim_order)
+        return values.reshape(values.shape[:-1] + (-1, 6))
+
+    def get_frequency_response(self, frequencies, indices=None, out=None):
+        """Complex frequency responses of all selected cascades at once, evaluated section by section
+
+        Parameters
+        ----------
+        frequencies : array_like
+            Frequencies in hertz
+        indices : dict(key:str, value:int or slice), optional
+            Key: dimension name ("M" or "R"), value: indices to be returned, complete axis assumed if not provided
+        out : np.ndarray, optional
+            Preallocated complex output array
+
+        Returns
+        -------
+        response : np.ndarray
+            Frequency responses, dimensions ("M", "R", frequencies) without integer-indexed dimensions
+        """
+        indices = None if indices is None else dict(indices)
+        cascades = self.get_cascades(indices)
+        rates = self.SamplingRate.get_values(indices=None if indices is None or "M" not in indices else
+                                             {"M": indices["M"]})
+        if np.size(rates) > 1:  # one rate per measurement along the first axis of the cascades
+            rates = rates.reshape((-1,) + (1,) * (cascades.ndim - 3))
+        frequencies = np.atleast_1d(np.asarray(frequencies, dtype=float))
+        z = np.exp(-2j * np.pi * frequencies / np.asarray(rates, dtype=float)[..., None])  # z^-1
+
+        if out is None: out = np.empty(cascades.shape[:-2] + frequencies.shape, dtype=complex)
+        out[...] = 1
+        for section in np.moveaxis(cascades, -2, 0):
+            b0, b1, b2, a0, a1, a2 = [c[..., None] for c in np.moveaxis(section, -1, 0)]
+            out *= (b0 + z * (b1 + z * b2))
+            out /= (a0 + z * (a1 + z * a2))
+        return out
+
+    def create_filter(self, indices=None):
+        """Stateful filter of audio blocks through the selected cascades, see :class:`CascadeFilter`
+
+        Parameters
+        ----------
+        indices : dict(key:str, value:int or slice), optional
+            Key: dimension name ("M" or "R"), value: indices of the cascades, complete axis assumed if not provided
+
+        Returns
+        -------
+        cascade_filter : :class:`CascadeFilter`
+            Filter with one channel per selected cascade
+        """
+        return CascadeFilter(self.get_cascades(indices))
+
+
+class CascadeFilter:
+    """Filter audio blocks through many cascades of second order sections, keeping the filter state between blocks
+
+    All channels and sections are filtered at once in transposed direct form II, with section k processing sample
+    t - k while section 0 processes sample t, so that only the samples are iterated. The filter state has the layout
+    of :func:`scipy.signal.sosfilt`. Data.Delay is not applied.
+
+    Parameters
+    ----------
+    cascades : np.ndarray
+        Coefficients [b0, b1, b2, a0, a1, a2], dimensions (channels..., sections, 6)
+    """
+
+    def __init__(self, cascades):
+        cascades = np.asarray(cascades, dtype=float)
+        if np.any(cascades[..., 3] == 0): raise ValueError("second order sections with a0 = 0")
+        self._shape = cascades.shape[:-2]
+        self._cascades = (cascades / cascades[..., 3:4]).reshape((-1,) + cascades.shape[-2:])
+        self._state = np.zeros((2,) + self._cascades.shape[:2])
+
+    @property
+    def shape(self):
+        """Dimensions of the channels"""
+        return self._shape
+
+    def reset(self):
+        """Clear the filter state of all channels"""
+        self._state[...] = 0
+
+    def process(self, blocks, out=None):
+        """Filter one audio block per channel
+
+        Parameters
+        ----------
+        blocks : np.ndarray
+            Audio blocks, dimensions (channels..., samples), or (samples,) to filter the same block in every channel
+        out : np.ndarray, optional
+            Preallocated output array, dimensions (channels..., samples)
+
+        Returns
+        -------
+        output : np.ndarray
+            Filtered blocks, dimensions (channels..., samples)
+        """
+        blocks = np.asarray(blocks, dtype=float)
+        samples = blocks.shape[-1]
+        blocks = np.broadcast_to(blocks, self._shape + (samples,)).reshape((-1, samples))
+        if out is None: out = np.empty(self._shape + (samples,))
+        result = out.reshape((-1, samples))
+        sections = self._cascades.shape[1]
+        b0, b1, b2, _, a1, a2 = np.moveaxis(self._cascades, -1, 0)
+        z0, z1 = self._state
+        inputs = np.zeros(self._cascades.shape[:2])
+
+        for t in range(samples + sections - 1):
+            lo, hi = max(0, t - samples + 1), min(sections, t + 1)  # sections with a sample to process
+            if t < samples: inputs[:, 0] = blocks[:, t]
+            x = inputs[:, lo:hi]
+            y = b0[:, lo:hi] * x + z0[:, lo:hi]
+            z0[:, lo:hi] = b1[:, lo:hi] * x - a1[:, lo:hi] * y + z1[:, lo:hi]
+            z1[:, lo:hi] = b2[:, lo:hi] * x - a2[:, lo:hi] * y
+            if hi == sections: result[:, t - sections + 1] = y[:, -1]
+            inputs[:, lo + 1:hi + 1] = y[:, :min(hi, sections - 1) - lo]
+        if not np.shares_memory(result, out): out[...] = result.reshape(out.shape)
+        return out
@@ -18,7 +18,10 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
+import numpy as np
+
 from .base import _Base
+from .. import access
 
 
 class TF(_Base):
@@ -45,8 +48,141 @@ class TF(_Base):
     @N.setter
     def N(self, value): self.N.set_values(value)
 
-    def initialize(self, sample_count=None, variances=[], string_length=None):
-        super().initialize(sample_count, variances, string_length)
+    def initialize(self, sample_count=None, variances=[], string_length=None, data_types=None):
+        super().initialize(sample_count, variances, string_length, data_types)
         var = self.database.Variables.create_variable("N", ("N",))
         # var.LongName = "frequency" # LongName not mandatory
         var.Units = "hertz"
+
+    def _measurement_blocks(self, measurements):
+        """Ranges of measurements aligned with the chunks of Real along M, None for single reads"""
+        from .. import _derive
+
+        if access.is_integer(measurements) or not isinstance(measurements, slice): return None
+        start, stop, step = measurements.indices(self.database.Dimensions.M)
+        if step != 1: return None
+        matrix = self.Real._Matrix
+        size = _derive.measurement_block_size(matrix)
+        chunking = matrix.chunking()
+        if chunking != "contiguous": size = max(size - size % chunking[0], chunking[0])
+        bounds = [start] + list(range(start - start % size + size, stop, size)) + [stop]
+        return [slice(a, b) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+    def _spectrum_shape(self, indices, dim_order):
+        shape = []
+        for d in dim_order:
+            size = self.database.Dimensions.get_dimension(d)
+            index = indices.get(d, slice(None))
+            shape.append(len(range(*index.indices(size))) if isinstance(index, slice) else len(index))
+        return tuple(shape)
+
+    def get_spectrum(self, indices=None, dim_order=None, out=None, dtype=np.complex128):
+        """Read Real and Imag into one complex array, measurement block by block aligned with the variable chunks
+
+        Parameters
+        ----------
+        indices : dict(key:str, value:int or slice), optional
+            Key: dimension name, value: indices to be returned, complete axis assumed if not provided
+        dim_order : tuple of str, optional
+            Desired order of dimensions in the output array
+        out : np.ndarray, optional
+            Preallocated complex output array
+        dtype : np.dtype, optional
+            Complex data type of the output array if out is not provided
+
+        Returns
+        -------
+        spectrum : np.ndarray
+            Complex spectra in regular or desired dimension order, if provided
+        """
+        indices = dict() if indices is None else dict(indices)
+        if dim_order is None: dim_order = access.get_default_dimension_order(self.Real.dimensions(), indices)
+        blocks = self._measurement_blocks(indices.get("M", slice(None)))
+        if out is None: out = np.empty(self._spectrum_shape(indices, dim_order), dtype=dtype)
+        if blocks is None:
+            with access.dataset_lock:
+                out.real[...] = self.Real.get_values(indices, dim_order)
+                out.imag[...] = self.Imag.get_values(indices, dim_order)
+            return out
+
+        axis = dim_order.index("M")
+        for block in blocks:
+            offset = block.start - blocks[0].start
+            target = out[(slice(None),) * axis + (slice(offset, offset + block.stop - block.start),)]
+            block_indices = dict(indices, M=block)
+            with access.dataset_lock:
+                target.real[...] = self.Real.get_values(block_indices, dim_order)
+                target.imag[...] = self.Imag.get_values(block_indices, dim_order)
+        return out
+
+    def set_spectrum(self, values, indices=None, dim_order=None):
+        """Write a complex array to Real and Imag, measurement block by block aligned with the variable chunks
+
+        Parameters
+        ----------
+        values : np.ndarray
+            Complex spectra for the array range
+        indices : dict(key:str, value:int or slice), optional
+            Key: dimension name, value: indices to be set, complete axis assumed if not provided
+        dim_order : tuple of str, optional
+            Dimension names in provided order, regular order assumed
+        """
+        values = np.asarray(values)
+        indices = dict() if indices is None else dict(indices)
+        blocks = self._measurement_blocks(indices.get("M", slice(None)))
+        if blocks is None:
+            with access.dataset_lock:
+                self.Real.set_values(values.real, indices, dim_order)
+                self.Imag.set_values(values.imag, indices, dim_order)
+            return
+
+        axis = (dim_order if dim_order is not None else self.Real.dimensions()).index("M")
+        for block in blocks:
+            offset = block.start - blocks[0].start
+            source = values[(slice(None),) * axis + (slice(offset, offset + block.stop - block.start),)]
+            block_indices = dict(indices, M=block)
+            with access.dataset_lock:
+                self.Real.set_values(source.real, dict(block_indices), dim_order)
+                self.Imag.set_values(source.imag, dict(block_indices), dim_order)
+
+    def get_magnitude(self, indices=None, dim_order=None, out=None):
+        """Magnitude of the complex spectra
+
+        Parameters
+        ----------
+        indices : dict(key:str, value:int or slice), optional
+            Key: dimension name, value: indices to be returned, complete axis assumed if not provided
+        dim_order : tuple of str, optional
+            Desired order of dimensions in the output array
+        out : np.ndarray, optional
+            Preallocated output array, otherwise the magnitude overwrites the real part of the spectrum read
+
+        Returns
+        -------
+        magnitude : np.ndarray
+            Magnitude in regular or desired dimension order, if provided
+        """
+        spectrum = self.get_spectrum(indices, dim_order)
+        if out is None: out = spectrum.real
+        return np.hypot(spectrum.real, spectrum.imag, out=out)
+
+    def get_phase(self, indices=None, dim_order=None, out=None):
+        """Phase of the complex spectra in radians
+
+        Parameters
+        ----------
+        indices : dict(key:str, value:int or slice), optional
+            Key: dimension name, value: indices to be returned, complete axis assumed if not provided
+        dim_order : tuple of str, optional
+            Desired order of dimensions in the output array
+        out : np.ndarray, optional
+            Preallocated output array, otherwise the phase overwrites the real part of the spectrum read
+
+        Returns
+        -------
+        phase : np.ndarray
+            Phase in regular or desired dimension order, if provided
+        """
+        spectrum = self.get_spectrum(indices, dim_order)
+        if out is None: out = spectrum.real
+        return np.arctan2(spectrum.imag, spectrum.real, out=out)
@@ -21,13 +21,16 @@
 """Classes for accessing DataType-specific measurement data.
 """
 
-__all__=["implemented", "FIR", "FIRE", "SOS", "TF"]
+__all__=["implemented", "FIR", "FIRE", "SOS", "TF", "CascadeFilter", "conversion", "samplingrate", "minimumphase"]
 
 from .FIR import FIR
 from .TF import TF
 
 from .FIRE import FIRE
-from .SOS import SOS
+from .SOS import SOS, CascadeFilter
+from . import conversion
+from . import samplingrate
+from . import minimumphase
 
 ##############################
 List = {
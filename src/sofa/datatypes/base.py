@@ -20,6 +20,9 @@
 
 from .. import access
 
+# storage types of data variables, SOFA specifies double but readers commonly accept float
+storage_types = ["d", "f"]
+
 class _Base(access.ProxyObject):
     def __init__(self, database):
         super().__init__(database, "Data.")
@@ -38,7 +41,7 @@ class _Base(access.ProxyObject):
             if any(["I" in dims for dims in v]) and any(["M" in dims for dims in v]): vardims.append(k)
         return vardims
 
-    def initialize(self, sample_count=None, variances=[], string_length=None):
+    def initialize(self, sample_count=None, variances=[], string_length=None, data_types=None):
         """Create the necessary variables and attributes
 
         Parameters
@@ -49,7 +52,15 @@ class _Base(access.ProxyObject):
             Names of the variables that vary along dimension M
         string_length : int, optional
             Size of the longest data string
+        data_types : dict(key:str, value:str), optional
+            Storage type of data variables ("d": 64 bit, "f": 32 bit floating point), e.g. {"IR": "f"}, double if not
+            provided
         """
+        if data_types is None: data_types = dict()
+        for k, t in data_types.items():
+            if k not in self.standard_dimensions: raise ValueError("{0} is not a data variable".format(k))
+            if t not in storage_types: raise ValueError("Storage type {0} not in {1}".format(t, storage_types))
+
         if "N" not in self.database.Dimensions.list_dimensions():
             if sample_count is None: raise ValueError("Missing sample count N!")
             self.database.Dimensions.create_dimension("N", sample_count)
@@ -62,7 +73,7 @@ class _Base(access.ProxyObject):
             if any(["S" in dims for dims in v]):
                 var = self.create_string_array(k, v[i])
             else:
-                var = self.create_variable(k, v[i])
+                var = self.create_variable(k, v[i], data_type=data_types.get(k, "d"))
                 if k + ":Type" in default_values: var.Type = default_values[k + ":Type"]
                 if k + ":Units" in default_values: var.Units = default_values[k + ":Units"]
             if k in default_values and default_values[k] != 0:
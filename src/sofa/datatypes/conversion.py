@@ -0,0 +1,158 @@
+# Copyright (c) 2019 Jannika Lossner
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""Conversion between impulse response (FIR, FIRE) and transfer function (TF) databases, block by block along M.
+"""
+import numpy as np
+from scipy import fft
+
+from .. import access
+
+# convention of the converted database, GeneralTF or GeneralFIR for conventions not listed
+tf_conventions = {"SimpleFreeFieldHRIR": "SimpleFreeFieldTF"}
+fir_conventions = {"SimpleFreeFieldTF": "SimpleFreeFieldHRIR"}
+
+
+def _create_converted(database, path, convention, sample_count, data_names):
+    """Derived database without the data variables and all other variables along N, with appended History"""
+    from .. import _derive
+
+    exclude = [n for n in database.Variables.list_variables() if n in data_names or "N" in database.dataset[n].dimensions]
+    converted = _derive.create_derived(database, path, convention, dimensions={"N": sample_count}, exclude=exclude)
+    history = database.Metadata.get_attribute("History")
+    converted.Metadata.set_attribute("History", (history + "\n" if history else "") +
+                                     "converted from {0} to {1}".format(database.DataType, converted.DataType))
+    _derive.copy_variables(database, converted, [n for n in converted.Variables.list_variables()
+                                                 if n in database.Variables.list_variables()])
+    converted.Data.initialize()
+    return converted
+
+
+def _measurement_blocks(database, variable, block_size):
+    from .. import _derive
+    if block_size is None: block_size = _derive.measurement_block_size(database.dataset[variable.name])
+    M = database.Dimensions.M
+    return [slice(b, min(b + block_size, M)) for b in range(0, M, block_size)]
+
+
+def fir_to_tf(database, path, convention=None, fft_size=None, block_size=None, workers=None):
+    """Write a new TF database with the spectra of the impulse responses of a FIR or FIRE database
+
+    Spectra are computed with real FFTs, Data.Delay is applied as linear phase. All other variables and
+    attributes are carried over.
+
+    Parameters
+    ----------
+    database : :class:`sofa.Database`
+        Database of DataType FIR, or FIRE with a single emitter
+    path : str
+        Relative or absolute path of the new .sofa file
+    convention : str, optional
+        Name of the SOFA convention of the new database, see :data:`tf_conventions`
+    fft_size : int, optional
+        Length of the FFT, the impulse responses are zero-padded, dimension N of the database if not provided
+    block_size : int, optional
+        Number of measurements transformed at once, determined from the variable size if not provided
+    workers : int, optional
+        Number of threads computing each FFT
+
+    Returns
+    -------
+    converted : :class:`sofa.Database`
+        New database of DataType TF
+    """
+    ir = database.Data.IR
+    dimensions = ir.dimensions()
+    if dimensions not in [("M", "R", "N"), ("M", "R", "E", "N")]:
+        raise Exception("cannot convert DataType {0} to TF".format(database.DataType))
+    if "E" in dimensions and database.Dimensions.E != 1:
+        raise Exception("cannot convert FIRE data of {0} emitters to TF".format(database.Dimensions.E))
+    if convention is None: convention = tf_conventions.get(database.convention.name, "GeneralTF")
+
+    rates = np.unique(database.Data.SamplingRate.get_values())
+    if len(rates) != 1: raise Exception("cannot convert measurements of different sampling rates to TF")
+    M, R = database.Dimensions.M, database.Dimensions.R
+    if fft_size is None: fft_size = database.Dimensions.N
+    frequencies = fft.rfftfreq(fft_size, 1 / rates[0])
+    emitter = {"E": 0} if "E" in dimensions else {}
+    delays = database.Data.Delay.get_values(indices=dict(emitter), dim_order=("M", "R"))
+    delays = np.broadcast_to(delays.astype(float), (M, R))
+
+    converted = _create_converted(database, path, convention, len(frequencies), ["Data.IR", "Data.Delay",
+                                                                                 "Data.SamplingRate"])
+    converted.Data.N.set_values(frequencies)
+    converted.Data.N.LongName = "frequency"
+
+    for measurements in _measurement_blocks(database, ir, block_size):
+        values = ir.get_values(indices=dict(emitter, M=measurements), dim_order=("M", "R", "N"))
+        spectra = fft.rfft(values, n=fft_size, axis=-1, workers=workers)
+        if np.any(delays[measurements]):
+            spectra *= np.exp(-2j * np.pi * frequencies * (delays[measurements, :, None] / rates[0]))
+        converted.Data.Real.set_values(spectra.real, indices={"M": measurements}, dim_order=("M", "R", "N"))
+        converted.Data.Imag.set_values(spectra.imag, indices={"M": measurements}, dim_order=("M", "R", "N"))
+    return converted
+
+
+def tf_to_fir(database, path, convention=None, sample_count=None, block_size=None, workers=None):
+    """Write a new FIR database with the impulse responses of the spectra of a TF database
+
+    The frequencies in N must be the equidistant bins of a real FFT, starting at 0 Hz. All other variables and
+    attributes are carried over.
+
+    Parameters
+    ----------
+    database : :class:`sofa.Database`
+        Database of DataType TF
+    path : str
+        Relative or absolute path of the new .sofa file
+    convention : str, optional
+        Name of the SOFA convention of the new database, see :data:`fir_conventions`
+    sample_count : int, optional
+        Length of the impulse responses, 2 * (N - 1) if not provided
+    block_size : int, optional
+        Number of measurements transformed at once, determined from the variable size if not provided
+    workers : int, optional
+        Number of threads computing each inverse FFT
+
+    Returns
+    -------
+    converted : :class:`sofa.Database`
+        New database of DataType FIR
+    """
+    if database.DataType != "TF": raise Exception("cannot convert DataType {0} to FIR".format(database.DataType))
+    if convention is None: convention = fir_conventions.get(database.convention.name, "GeneralFIR")
+
+    frequencies = database.Data.N.get_values()
+    if sample_count is None: sample_count = 2 * (len(frequencies) - 1)
+    if len(frequencies) != sample_count // 2 + 1 or len(frequencies) < 2:
+        raise ValueError("{0} frequencies do not match {1} samples".format(len(frequencies), sample_count))
+    rate = frequencies[1] * sample_count
+    if not np.allclose(frequencies, fft.rfftfreq(sample_count, 1 / rate)):
+        raise ValueError("frequencies are not the bins of a real FFT of {0} samples".format(sample_count))
+
+    converted = _create_converted(database, path, convention, sample_count, ["Data.Real", "Data.Imag"])
+    converted.Data.SamplingRate.set_values(rate)
+
+    real, imag = database.Data.Real, database.Data.Imag
+    for measurements in _measurement_blocks(database, real, block_size):
+        spectra = real.get_values(indices={"M": measurements}, dim_order=("M", "R", "N")).astype(complex)
+        spectra.imag = imag.get_values(indices={"M": measurements}, dim_order=("M", "R", "N"))
+        values = fft.irfft(spectra, n=sample_count, axis=-1, workers=workers)
+        converted.Data.IR.set_values(values, indices={"M": measurements}, dim_order=("M", "R", "N"))
+    return converted
@@ -0,0 +1,317 @@
+# Copyright (c) 2019 Jannika Lossner
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""Shared functionality of the impulse response data types FIR and FIRE.
+"""
+import numpy as np
+from scipy import fft
+
+from .base import _Base
+from .. import access
+
+
+class _ImpulseResponseBase(_Base):
+
+    def get_delayed_values(self, indices=None, length=None, out=None):
+        """Impulse responses with Data.Delay applied, integer delays by shifting and fractional delays by a linear
+        phase in the frequency domain, for all selected measurements at once
+
+        Parameters
+        ----------
+        indices : dict(key:str, value:int or slice), optional
+            Key: dimension name ("M", "R" or "E"), value: indices to be returned, complete axis assumed if not provided
+        length : int, optional
+            Number of samples of the output, long enough for the impulse response with the largest delay if not provided
+        out : np.ndarray, optional
+            Preallocated output array
+
+        Returns
+        -------
+        values : np.ndarray
+            Delayed impulse responses, regular dimension order without integer-indexed dimensions and N of the given
+            length
+        """
+        indices = dict() if indices is None else dict(indices)
+        if "N" in indices: raise ValueError("cannot apply delays to part of the impulse responses")
+        dim_order = access.get_default_dimension_order(self.IR.dimensions(), indices)
+        values = self.IR.get_values(dict(indices), dim_order)
+        delays = np.broadcast_to(self.Delay.get_values(dict(indices), dim_order[:-1]), values.shape[:-1])
+        shifts = np.floor(delays).astype(int)
+        fractions = delays - shifts
+
+        samples = values.shape[-1]
+        if np.any(fractions):
+            size = fft.next_fast_len(2 * samples)
+            frequencies = np.arange(size // 2 + 1) / size
+            spectra = fft.rfft(values, n=size, axis=-1)
+            spectra *= np.exp(-2j * np.pi * frequencies * fractions[..., None])
+            samples += 1
+            values = fft.irfft(spectra, n=size, axis=-1)[..., :samples]
+
+        if length is None: length = samples + max(int(shifts.max(initial=0)), 0)
+        if out is None: out = np.empty(values.shape[:-1] + (length,), dtype=values.dtype)
+        out[...] = 0
+
+        # place each impulse response at its integer delay
+        targets = shifts[..., None] + np.arange(samples)
+        valid = (targets >= 0) & (targets < length)
+        selection = np.nonzero(valid)
+        out[selection[:-1] + (targets[valid],)] = values[valid]
+        return out
+
+    def _measurement_blocks(self, block_size):
+        from .. import _derive
+
+        M = self.database.Dimensions.M
+        size = block_size if block_size is not None else _derive.measurement_block_size(self.database.dataset[self.IR.name])
+        return [slice(b, min(b + size, M)) for b in range(0, M, size)]
+
+    def _read_blocks(self, blocks):
+        source = self.database.dataset[self.IR.name]
+        for block in blocks:
+            with access.dataset_lock:
+                yield block, access.read_selection(source, block)
+
+    def _write_shifted(self, path, onsets, length, blocks, history, window=None):
+        """New database with each impulse response starting at its onset, cut to length and optionally multiplied
+        with window(block), and the onsets added to a per-measurement Data.Delay"""
+        from .. import _derive
+
+        database = self.database
+        N = database.Dimensions.N
+        delay_dimensions = ("M",) + self.IR.dimensions()[1:-1]
+        shifted = _derive.create_derived(database, path, dimensions={"N": length},
+                                         variable_dimensions={self.Delay.name: delay_dimensions})
+        _derive.copy_variables(database, shifted, [n for n in shifted.Variables.list_variables()
+                                                   if n not in [self.IR.name, self.Delay.name]])
+        previous = database.Metadata.get_attribute("History")
+        shifted.Metadata.set_attribute("History", (previous + "\n" if previous else "") + history)
+
+        delays = np.broadcast_to(self.Delay.get_values(dim_order=delay_dimensions), onsets.shape)
+        shifted.dataset[self.Delay.name][...] = delays + onsets
+        target = shifted.dataset[self.IR.name]
+        for block, values in self._read_blocks(blocks):
+            positions = onsets[block][..., None] + np.arange(length)
+            values = np.where(positions < N, np.take_along_axis(values, np.minimum(positions, N - 1), axis=-1), 0)
+            if window is not None: values *= window(block)
+            with access.dataset_lock:
+                target[block] = values
+        return shifted
+
+    def trim_delays(self, path, threshold=0, margin=0, block_size=None):
+        """Write a new database with the onsets of the impulse responses moved into Data.Delay and N reduced to the
+        longest remaining impulse response
+
+        Parameters
+        ----------
+        path : str
+            Relative or absolute path of the new .sofa file
+        threshold : float, optional
+            Onset level relative to the peak of each impulse response, 0 removes exactly the leading zeros
+        margin : int, optional
+            Number of samples kept before each onset
+        block_size : int, optional
+            Number of measurements processed at once, determined from the variable size if not provided
+
+        Returns
+        -------
+        trimmed : :class:`sofa.Database`
+            New database
+        """
+        M, N = self.database.Dimensions.M, self.database.Dimensions.N
+        blocks = self._measurement_blocks(block_size)
+
+        # onset and end of each impulse response
+        onsets = np.empty((M,) + self.database.dataset[self.IR.name].shape[1:-1], dtype=int)
+        ends = np.empty_like(onsets)
+        for block, values in self._read_blocks(blocks):
+            magnitude = np.abs(values)
+            significant = magnitude > threshold * magnitude.max(axis=-1, keepdims=True)
+            nonzero = magnitude > 0
+            silent = ~nonzero.any(axis=-1)
+            onsets[block] = np.where(silent, N, np.maximum(np.argmax(significant, axis=-1) - margin, 0))
+            ends[block] = np.where(silent, 0, N - np.argmax(nonzero[..., ::-1], axis=-1))
+        length = max(int((ends - onsets).max(initial=1)), 1)
+        onsets = np.minimum(onsets, N)
+
+        return self._write_shifted(path, onsets, length, blocks,
+                                   "onsets moved into {0}, N trimmed from {1} to {2}".format(self.Delay.name, N, length))
+
+    def truncate(self, path, onset_level=-20, decay_level=-60, pre_onset=16, fade_out=32, block_size=None):
+        """Write a new database with the impulse responses truncated between their onset and decay, windowed and with
+        the onsets moved into Data.Delay
+
+        The onset of each impulse response is its first sample with an energy above onset_level relative to its peak,
+        its decay the last sample before the remaining energy drops below decay_level relative to its total energy.
+        All impulse responses are cut to the longest span from onset to decay, with a raised cosine fade-in over the
+        samples kept before the onset and a raised cosine fade-out.
+
+        Parameters
+        ----------
+        path : str
+            Relative or absolute path of the new .sofa file
+        onset_level : float, optional
+            Onset energy threshold in dB relative to the peak energy
+        decay_level : float, optional
+            Decay threshold of the remaining energy in dB relative to the total energy
+        pre_onset : int, optional
+            Number of samples kept before each onset
+        fade_out : int, optional
+            Length of the fade-out at the end of the truncated impulse responses
+        block_size : int, optional
+            Number of measurements processed at once, determined from the variable size if not provided
+
+        Returns
+        -------
+        truncated : :class:`sofa.Database`
+            New database
+        report : dict
+            "sample_count" and "truncated_sample_count" (dimension N), "data_bytes" and "truncated_data_bytes"
+            (size of Data.IR), "size_ratio" and "convolution_cost_ratio" (relative cost of FFT convolution)
+        """
+        M, N = self.database.Dimensions.M, self.database.Dimensions.N
+        source = self.database.dataset[self.IR.name]
+        blocks = self._measurement_blocks(block_size)
+
+        onsets = np.empty((M,) + source.shape[1:-1], dtype=int)
+        leads = np.empty_like(onsets)
+        spans = np.empty_like(onsets)
+        for block, values in self._read_blocks(blocks):
+            energy = np.square(values)
+            silent = ~(energy > 0).any(axis=-1)
+            onset = np.argmax(energy >= 10 ** (onset_level / 10) * energy.max(axis=-1, keepdims=True), axis=-1)
+            remaining = np.cumsum(energy[..., ::-1], axis=-1)[..., ::-1]
+            decay = np.sum(remaining >= 10 ** (decay_level / 10) * remaining[..., :1], axis=-1)
+            onsets[block] = np.where(silent, N, np.maximum(onset - pre_onset, 0))
+            leads[block] = np.where(silent, 0, onset - onsets[block])
+            spans[block] = np.where(silent, 0, decay - onsets[block])
+        length = min(max(int(spans.max(initial=1)), 1), N)
+
+        # fade-in over the samples before each onset, common fade-out at the end
+        positions = np.arange(length)
+        fade_out = min(fade_out, length)
+        ending = np.ones(length)
+        ending[length - fade_out:] = 0.5 + 0.5 * np.cos(np.pi * (np.arange(fade_out) + 0.5) / fade_out)
+
+        def window(block):
+            lead = leads[block][..., None]
+            fade_in = 0.5 - 0.5 * np.cos(np.pi * (positions + 0.5) / np.maximum(lead, 1))
+            return np.where(positions < lead, fade_in, 1) * ending
+
+        truncated = self._write_shifted(path, onsets, length, blocks,
+                                        "truncated from {0} to {1} samples with onsets moved into {2}".format(
+                                            N, length, self.Delay.name), window)
+        channels = int(np.prod(source.shape[:-1], dtype=np.int64))
+        fft_size, truncated_fft_size = fft.next_fast_len(2 * N), fft.next_fast_len(2 * length)
+        report = {
+            "sample_count": N,
+            "truncated_sample_count": length,
+            "data_bytes": channels * N * source.dtype.itemsize,
+            "truncated_data_bytes": channels * length * source.dtype.itemsize,
+            "size_ratio": length / N,
+            "convolution_cost_ratio": float(truncated_fft_size * np.log2(truncated_fft_size) /
+                                            (fft_size * np.log2(fft_size))),
+        }
+        return truncated, report
+
+    def quantise(self, path, bits=16, scale_dimensions=("M",), compressed=True, block_size=None):
+        """Write a new database with the impulse responses stored as integers with scale factors
+
+        Each impulse response is divided by the peak magnitude of its group along scale_dimensions, rounded to the
+        integer range of the given bit depth and stored with a netCDF scale_factor attribute. The peaks are stored in
+        an additional variable named by the "ScaleVariable" attribute, both are decoded transparently when reading
+        the values of Data.IR. 24 bit values are stored as 32 bit integers, their compression reclaims the unused byte.
+
+        Parameters
+        ----------
+        path : str
+            Relative or absolute path of the new .sofa file
+        bits : int, optional
+            Bit depth, 16 or 24
+        scale_dimensions : tuple of str, optional
+            Leading dimensions of Data.IR with individual scale factors, e.g. ("M",) or ("M", "R")
+        compressed : bool, optional
+            Whether to compress the variables with zlib
+        block_size : int, optional
+            Number of measurements processed at once, determined from the variable size if not provided
+
+        Returns
+        -------
+        quantised : :class:`sofa.Database`
+            New database
+        report : dict
+            "bits", "max_error" and "rms_error" (quantisation error of the values), "error_bound" (largest possible
+            quantisation error for the largest scale factor), "data_bytes" and "quantised_data_bytes" (uncompressed
+            size of Data.IR)
+        """
+        from .. import _derive
+
+        if bits not in (16, 24): raise ValueError("unsupported bit depth {0}, must be 16 or 24".format(bits))
+        dimensions = self.IR.dimensions()
+        scale_dimensions = tuple(scale_dimensions)
+        if scale_dimensions != dimensions[:len(scale_dimensions)] or "M" not in scale_dimensions or \
+                "N" in scale_dimensions:
+            raise ValueError("invalid scale dimensions {0}, must be leading dimensions of {1} without N".format(
+                scale_dimensions, dimensions))
+
+        database = self.database
+        source = database.dataset[self.IR.name]
+        scale_name = self.IR.name + "ScaleFactor"
+        steps = 2 ** (bits - 1) - 1
+        data_type = "i2" if bits == 16 else "i4"
+        quantised = _derive.create_derived(database, path, data_types={self.IR.name: data_type},
+                                           compressed=compressed)
+        _derive.copy_variables(database, quantised, [n for n in quantised.Variables.list_variables()
+                                                     if n != self.IR.name])
+        previous = database.Metadata.get_attribute("History")
+        quantised.Metadata.set_attribute("History", (previous + "\n" if previous else "") +
+                                         "{0} quantised to {1} bit with scale factors along {2}".format(
+                                             self.IR.name, bits, ", ".join(scale_dimensions)))
+
+        target = quantised.dataset[self.IR.name]
+        scales = quantised.dataset.createVariable(scale_name, "d", scale_dimensions, zlib=compressed)
+        target.setncattr("scale_factor", np.float64(1 / steps))
+        target.setncattr(access.scale_variable_attribute, scale_name)
+        target.set_auto_scale(False)
+
+        axes = tuple(range(len(scale_dimensions), len(dimensions)))
+        largest, squared, peak = 0., 0., 0.
+        for block, values in self._read_blocks(self._measurement_blocks(block_size)):
+            factors = np.abs(values).max(axis=axes, keepdims=True)
+            factors[factors == 0] = 1
+            integers = np.rint(values / factors * steps).astype(data_type)
+            with access.dataset_lock:
+                target[block] = integers
+                scales[block] = factors.reshape(factors.shape[:len(scale_dimensions)])
+            errors = integers * (factors / steps) - values
+            largest = max(largest, float(np.abs(errors).max(initial=0)))
+            squared += float(np.sum(np.square(errors)))
+            peak = max(peak, float(factors.max(initial=0)))
+        target.set_auto_scale(True)
+
+        count = int(np.prod(source.shape, dtype=np.int64))
+        report = {
+            "bits": bits,
+            "max_error": largest,
+            "rms_error": (squared / max(count, 1)) ** 0.5,
+            "error_bound": peak / (2 * steps),
+            "data_bytes": count * source.dtype.itemsize,
+            "quantised_data_bytes": count * target.dtype.itemsize,
+        }
+        return quantised, report
@@ -0,0 +1,166 @@
+# Copyright (c) 2019 Jannika Lossner
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""Minimum-phase decomposition of impulse responses with onset-based interaural time differences.
+"""
+import os
+from functools import partial
+
+import numpy as np
+from scipy import fft
+
+from .. import access
+from .. import _parallel
+
+
+def minimum_phase(irs, fft_size=None, floor=1e-10, out=None):
+    """Minimum-phase impulse responses with the same magnitude spectra, computed with the real cepstrum
+
+    Parameters
+    ----------
+    irs : np.ndarray
+        Impulse responses along the last axis
+    fft_size : int, optional
+        Length of the FFT, a multiple of the impulse response length reduces cepstral aliasing, 8 times the length
+        if not provided
+    floor : float, optional
+        Smallest magnitude relative to the peak of each spectrum, avoids the logarithm of zero
+    out : np.ndarray, optional
+        Preallocated output array
+
+    Returns
+    -------
+    minimum_phase_irs : np.ndarray
+        Minimum-phase impulse responses of the same length
+    """
+    irs = np.asarray(irs, dtype=float)
+    samples = irs.shape[-1]
+    if fft_size is None: fft_size = fft.next_fast_len(8 * samples)
+
+    magnitude = np.abs(fft.rfft(irs, n=fft_size, axis=-1))
+    np.maximum(magnitude, floor * magnitude.max(axis=-1, keepdims=True), out=magnitude)
+    magnitude[magnitude == 0] = floor
+    cepstrum = fft.irfft(np.log(magnitude, out=magnitude), n=fft_size, axis=-1)
+
+    # fold the anti-causal part of the cepstrum onto the causal part
+    cepstrum[..., 1:(fft_size + 1) // 2] *= 2
+    cepstrum[..., fft_size // 2 + 1:] = 0
+    spectrum = np.exp(fft.rfft(cepstrum, axis=-1))
+    values = fft.irfft(spectrum, n=fft_size, axis=-1)[..., :samples]
+    if out is None: return values
+    out[...] = values
+    return out
+
+
+def onsets(irs, threshold=0.1):
+    """Onsets of impulse responses, interpolated between the samples around the first crossing of a threshold
+
+    Parameters
+    ----------
+    irs : np.ndarray
+        Impulse responses along the last axis
+    threshold : float, optional
+        Onset level relative to the absolute peak of each impulse response
+
+    Returns
+    -------
+    onsets : np.ndarray
+        Onsets in samples, 0 for silent impulse responses
+    """
+    magnitude = np.abs(irs)
+    level = threshold * magnitude.max(axis=-1, keepdims=True)
+    crossing = np.argmax(magnitude >= level, axis=-1)
+    after = np.take_along_axis(magnitude, crossing[..., None], axis=-1)[..., 0]
+    before = np.take_along_axis(magnitude, np.maximum(crossing - 1, 0)[..., None], axis=-1)[..., 0]
+    rise = after - before
+    fraction = np.divide(level[..., 0] - before, rise, out=np.ones_like(rise), where=rise > 0)
+    return np.where(crossing > 0, crossing - 1 + fraction, 0.)
+
+
+def _decompose_block(values, fft_size, threshold):
+    return minimum_phase(values, fft_size), onsets(values, threshold)
+
+
+def decompose(database, path, fft_size=None, threshold=0.1, remove_common_delay=True, block_size=None,
+              workers=None):
+    """Write a new database with minimum-phase impulse responses and their onsets as Data.Delay
+
+    The interaural time differences are kept as the differences of Data.Delay between receivers. Data.IR is
+    processed in blocks of measurements on a process pool, with at most two blocks per worker in memory.
+
+    Parameters
+    ----------
+    database : :class:`sofa.Database`
+        Database of DataType FIR or FIRE, e.g. SimpleFreeFieldHRIR
+    path : str
+        Relative or absolute path of the new .sofa file
+    fft_size : int, optional
+        Length of the FFT of the cepstral method, see :func:`minimum_phase`
+    threshold : float, optional
+        Onset level relative to the peak of each impulse response, see :func:`onsets`
+    remove_common_delay : bool, optional
+        Whether to subtract the smallest delay of each measurement from the delays of all its receivers (and emitters)
+    block_size : int, optional
+        Number of measurements processed at once, determined from the variable size if not provided
+    workers : int, optional
+        Number of worker processes, 1 processes in the calling process
+
+    Returns
+    -------
+    decomposed : :class:`sofa.Database`
+        New database
+    """
+    from .. import _derive
+
+    ir, delay = database.Data.IR, database.Data.Delay
+    dimensions = ir.dimensions()
+    if dimensions not in [("M", "R", "N"), ("M", "R", "E", "N")]:
+        raise Exception("cannot decompose DataType {0}".format(database.DataType))
+
+    delay_dimensions = dimensions[:-1]
+    decomposed = _derive.create_derived(database, path, variable_dimensions={delay.name: delay_dimensions})
+    _derive.copy_variables(database, decomposed, [n for n in decomposed.Variables.list_variables()
+                                                  if n not in [ir.name, delay.name]])
+    history = database.Metadata.get_attribute("History")
+    decomposed.Metadata.set_attribute("History", (history + "\n" if history else "") +
+                                      "minimum-phase decomposition with onsets in {0}".format(delay.name))
+
+    source, target = database.dataset[ir.name], decomposed.dataset[ir.name]
+    delays = np.array(np.broadcast_to(delay.get_values(dim_order=delay_dimensions),
+                                      (database.Dimensions.M,) + source.shape[1:-1]), dtype=float)
+    size = block_size if block_size is not None else _derive.measurement_block_size(source)
+    blocks = _parallel.block_slices(0, database.Dimensions.M, size)
+
+    def read_blocks():
+        for block in blocks:
+            with access.dataset_lock:
+                yield access.read_selection(source, block)
+
+    decompose_block = partial(_decompose_block, fft_size=fft_size, threshold=threshold)
+    results = _parallel.imap_blocks(decompose_block, read_blocks(), workers, processes=True,
+                                    max_pending=2 * (workers or os.cpu_count() or 1))
+    for block, (values, block_onsets) in zip(blocks, results):
+        delays[block] += block_onsets
+        with access.dataset_lock:
+            target[block] = values
+
+    if remove_common_delay:
+        delays -= delays.reshape(len(delays), -1).min(axis=-1).reshape((-1,) + (1,) * (delays.ndim - 1))
+    decomposed.dataset[delay.name][...] = delays
+    return decomposed
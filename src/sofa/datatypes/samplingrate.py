@@ -0,0 +1,169 @@
+# Copyright (c) 2019 Jannika Lossner
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""Sampling rate conversion of impulse response databases with polyphase filtering, block by block along M.
+"""
+import hashlib
+import os
+from fractions import Fraction
+from functools import partial
+
+import numpy as np
+from scipy import signal
+
+from .. import access
+from .. import _parallel
+
+
+def _resample_block(values, up, down, window):
+    return signal.resample_poly(values, up, down, axis=-1, window=window)
+
+
+def convert_sampling_rate(database, path, rate, window=("kaiser", 5.0), block_size=None, workers=None):
+    """Write a new database with the impulse responses of a FIR or FIRE database at a different sampling rate
+
+    Data.IR is read and written in blocks of measurements that are resampled on a process pool, with at most two
+    blocks per worker in memory. Data.SamplingRate, Data.Delay and dimension N are updated, all other variables and
+    attributes are carried over.
+
+    Parameters
+    ----------
+    database : :class:`sofa.Database`
+        Database of DataType FIR or FIRE with a single sampling rate
+    path : str
+        Relative or absolute path of the new .sofa file
+    rate : float
+        New sampling rate in hertz
+    window : str, tuple or array_like, optional
+        Window of the polyphase anti-aliasing filter, see :func:`scipy.signal.resample_poly`
+    block_size : int, optional
+        Number of measurements resampled at once, determined from the variable size if not provided
+    workers : int, optional
+        Number of worker processes, 1 resamples in the calling process
+
+    Returns
+    -------
+    converted : :class:`sofa.Database`
+        New database
+    """
+    from .. import _derive
+
+    ir = database.Data.IR
+    if ir.dimensions() not in [("M", "R", "N"), ("M", "R", "E", "N")]:
+        raise Exception("cannot convert the sampling rate of DataType {0}".format(database.DataType))
+    rates = np.unique(database.Data.SamplingRate.get_values())
+    if len(rates) != 1: raise Exception("cannot convert measurements of different sampling rates")
+    ratio = Fraction(rate / rates[0]).limit_denominator(1 << 16)
+    up, down = ratio.numerator, ratio.denominator
+
+    M, N = database.Dimensions.M, database.Dimensions.N
+    length = -(-N * up // down)
+    converted = _derive.create_derived(database, path, dimensions={"N": length})
+    _derive.copy_variables(database, converted, [n for n in converted.Variables.list_variables()
+                                                 if n not in [ir.name, database.Data.Delay.name]])
+    history = database.Metadata.get_attribute("History")
+    converted.Metadata.set_attribute("History", (history + "\n" if history else "") +
+                                     "sampling rate converted from {0} to {1} hertz".format(rates[0], rate))
+    converted.Data.SamplingRate.set_values(rate)
+    converted.dataset[database.Data.Delay.name][...] = database.dataset[database.Data.Delay.name][...] * up / down
+
+    source, target = database.dataset[ir.name], converted.dataset[ir.name]
+    size = block_size if block_size is not None else _derive.measurement_block_size(source)
+    blocks = _parallel.block_slices(0, M, size)
+
+    def read_blocks():
+        for block in blocks:
+            with access.dataset_lock:
+                yield access.read_selection(source, block)
+
+    resample_block = partial(_resample_block, up=up, down=down, window=window)
+    results = _parallel.imap_blocks(resample_block, read_blocks(), workers, processes=True,
+                                    max_pending=2 * (workers or os.cpu_count() or 1))
+    for block, values in zip(blocks, results):
+        with access.dataset_lock:
+            target[block] = values
+    return converted
+
+
+class SamplingRateCache:
+    """Resampled variants of databases, keyed by source file and target sampling rate
+
+    Variants are written to a cache directory on first request, named by the source file name, a hash of its
+    absolute path and the sampling rate, and reused while they are newer than their source file, also across
+    sessions. Opened variants are kept open until :meth:`close` is called.
+
+    Parameters
+    ----------
+    directory : str
+        Directory for the resampled .sofa files
+    window : str, tuple or array_like, optional
+        Window of the polyphase anti-aliasing filter, see :func:`convert_sampling_rate`
+    workers : int, optional
+        Number of worker processes for conversions
+    """
+
+    def __init__(self, directory, window=("kaiser", 5.0), workers=None):
+        self._directory = directory
+        self._window = window
+        self._workers = workers
+        self._variants = dict()
+
+    def get(self, database, rate):
+        """Variant of a database at the given sampling rate, the database itself if it already has that rate
+
+        Parameters
+        ----------
+        database : :class:`sofa.Database`
+            Database of DataType FIR or FIRE
+        rate : float
+            Sampling rate in hertz
+
+        Returns
+        -------
+        variant : :class:`sofa.Database`
+            Database at the requested sampling rate, opened read-only
+        """
+        from .._database import Database
+
+        if np.all(database.Data.SamplingRate.get_values() == rate): return database
+        source = os.path.abspath(database.dataset.filepath())
+        key = (source, float(rate))
+        if key in self._variants: return self._variants[key]
+
+        # the hash of the source path distinguishes files of the same name in different directories
+        name = "{0}_{1}_{2:g}Hz.sofa".format(os.path.splitext(os.path.basename(source))[0],
+                                            hashlib.sha1(source.encode("utf-8")).hexdigest()[:12], rate)
+        path = os.path.join(self._directory, name)
+        if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(source):
+            # write to a temporary file first, so that failed conversions never leave a variant behind
+            os.makedirs(self._directory, exist_ok=True)
+            temporary = path + ".{0}.tmp".format(os.getpid())
+            try:
+                convert_sampling_rate(database, temporary, rate, self._window, workers=self._workers).close()
+                os.replace(temporary, path)
+            except BaseException:
+                if os.path.exists(temporary): os.remove(temporary)
+                raise
+        self._variants[key] = Database.open(path)
+        return self._variants[key]
+
+    def close(self):
+        """Close all opened variants"""
+        for variant in self._variants.values(): variant.close()
+        self._variants.clear()
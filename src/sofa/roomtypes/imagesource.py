@@ -0,0 +1,157 @@
+# Copyright (c) 2019 Jannika Lossner
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""Image-source synthesis of room impulse responses for shoebox rooms.
+"""
+from functools import partial
+
+import numpy as np
+
+from .. import _parallel
+from ..spatial import System
+from .shoebox import Shoebox
+
+
+def image_table(max_order):
+    """Image sources of a cuboid up to a given reflection order, independent of the room geometry
+
+    Along each axis, an image is placed at 2 * n * size + sign * (source - lower) + lower, reflecting
+    abs(n - q) times on the lower and abs(n) times on the upper wall, with sign = 1 - 2 * q.
+
+    Parameters
+    ----------
+    max_order : int
+        Maximum total number of reflections
+
+    Returns
+    -------
+    factors : np.ndarray
+        Multiples 2 * n of the room size, dimensions (images, 3)
+    signs : np.ndarray
+        Mirroring of the source position, dimensions (images, 3)
+    reflections : np.ndarray
+        Number of reflections on each wall (lower x, upper x, lower y, upper y, lower z, upper z),
+        dimensions (images, 6)
+    """
+    n, q = np.meshgrid(np.arange(-max_order, max_order + 1), [0, 1], indexing="ij")
+    n, q = n.ravel(), q.ravel()
+    axis_reflections = np.stack([np.abs(n - q), np.abs(n)], axis=-1)
+    valid = axis_reflections.sum(axis=-1) <= max_order
+    n, q, axis_reflections = n[valid], q[valid], axis_reflections[valid]
+
+    ix, iy, iz = [i.ravel() for i in np.meshgrid(*[np.arange(len(n))] * 3, indexing="ij")]
+    reflections = np.concatenate([axis_reflections[ix], axis_reflections[iy], axis_reflections[iz]], axis=-1)
+    valid = reflections.sum(axis=-1) <= max_order
+    ix, iy, iz = ix[valid], iy[valid], iz[valid]
+
+    factors = 2 * np.stack([n[ix], n[iy], n[iz]], axis=-1)
+    signs = 1 - 2 * np.stack([q[ix], q[iy], q[iz]], axis=-1)
+    return factors, signs, reflections[valid]
+
+
+def _synthesize_block(arguments, factors, signs, gains, sample_count, speed_of_sound, filter_length):
+    """Impulse responses of a block of measurements, dimensions (M, R, E, N)"""
+    lower, size, sources, receivers, rates = arguments
+    block, R, E = len(lower), receivers.shape[1], sources.shape[1]
+
+    # image positions (M, E, images, C) and their distances to the receivers (M, R, E, images)
+    images = lower[:, None, None, :] + factors * size[:, None, None, :] \
+             + signs * (sources - lower[:, None, :])[:, :, None, :]
+    distances = np.linalg.norm(receivers[:, :, None, None, :] - images[:, None, :, :, :], axis=-1)
+    delays = distances * (rates / speed_of_sound)[:, None, None, None]
+    amplitudes = gains / (4 * np.pi * np.maximum(distances, np.finfo(float).eps))
+
+    # spread each image with a Hann-windowed sinc over filter_length samples for fractional delays
+    if filter_length > 1:
+        taps = np.floor(delays).astype(np.int64)[..., None] + np.arange(1 - filter_length // 2, filter_length // 2 + 1)
+        offsets = taps - delays[..., None]
+        weights = np.sinc(offsets) * (0.5 + 0.5 * np.cos(2 * np.pi * offsets / (filter_length + 1)))
+        weights *= amplitudes[..., None]
+    else:
+        taps, weights = np.rint(delays).astype(np.int64), amplitudes
+
+    # accumulate all images into the flattened (M, R, E, N) output
+    channels = np.arange(block * R * E).reshape(block, R, E, *(1,) * (taps.ndim - 3))
+    valid = (taps >= 0) & (taps < sample_count)
+    indices = (channels * sample_count + taps)[valid]
+    irs = np.bincount(indices, weights=weights[valid], minlength=block * R * E * sample_count)
+    return irs.reshape(block, R, E, sample_count)
+
+
+def synthesize(database, max_order=10, reflection=0.9, speed_of_sound=343., filter_length=16, block_size=None,
+               workers=None):
+    """Synthesize the room impulse responses of all measurements, receivers and emitters with the image-source
+    method and write them to Data.IR of the database
+
+    The room is the cuboid spanned by Room.CornerA and Room.CornerB, Emitter and Receiver positions are evaluated
+    in the global reference system. The impulse responses include the propagation delay, Data.Delay is not
+    modified. For DataType FIR, the impulse responses of multiple emitters are summed.
+
+    Parameters
+    ----------
+    database : :class:`sofa.Database`
+        Database with RoomType 'shoebox' and DataType FIR or FIRE, opened for writing
+    max_order : int, optional
+        Maximum total number of wall reflections per image source
+    reflection : float or array_like, optional
+        Pressure reflection coefficient of all walls, or of each wall (lower x, upper x, lower y, upper y,
+        lower z, upper z), lower being the smaller coordinate of both corners
+    speed_of_sound : float, optional
+        Speed of sound in metre per second
+    filter_length : int, optional
+        Length of the fractional delay filters in samples, 1 rounds delays to full samples
+    block_size : int, optional
+        Number of measurements synthesized at once, bounds the size of temporary arrays
+    workers : int, optional
+        Number of worker processes synthesizing blocks of measurements, 1 synthesizes in the calling process
+    """
+    room = database.Room
+    if not isinstance(room, Shoebox):
+        raise Exception("image-source synthesis requires RoomType 'shoebox', not '{0}'".format(database.RoomType))
+    ir_dimensions = database.Data.IR.dimensions()
+    if ir_dimensions not in [("M", "R", "N"), ("M", "R", "E", "N")]:
+        raise Exception("image-source synthesis requires DataType FIR or FIRE, not {0}".format(database.DataType))
+
+    M, N = database.Dimensions.M, database.Dimensions.N
+    factors, signs, reflections = image_table(max_order)
+    gains = np.prod(np.broadcast_to(np.asarray(reflection, dtype=float), (6,)) ** reflections, axis=-1)
+    filter_length = max(int(filter_length), 1)
+
+    # room geometry, positions and sampling rates for all measurements
+    def per_measurement(values): return np.broadcast_to(values, (M,) + values.shape[1:])
+    corner_a = per_measurement(room.CornerA.get_values(dim_order=("M", "C"), system=System.Cartesian))
+    corner_b = per_measurement(room.CornerB.get_values(dim_order=("M", "C"), system=System.Cartesian))
+    lower, size = np.minimum(corner_a, corner_b), np.abs(corner_b - corner_a)
+    sources = per_measurement(database.Emitter.Position.get_global_values(dim_order=("M", "E", "C"),
+                                                                          system=System.Cartesian))
+    receivers = per_measurement(database.Receiver.Position.get_global_values(dim_order=("M", "R", "C"),
+                                                                             system=System.Cartesian))
+    rates = per_measurement(np.atleast_1d(database.Data.SamplingRate.get_values()).astype(float))
+
+    if block_size is None:
+        per_measurement_size = receivers.shape[1] * sources.shape[1] * len(factors) * filter_length
+        block_size = max(1, 2 ** 22 // per_measurement_size)
+    blocks = _parallel.block_slices(0, M, block_size)
+    arguments = [tuple(np.ascontiguousarray(a[b]) for a in (lower, size, sources, receivers, rates)) for b in blocks]
+
+    synthesize_block = partial(_synthesize_block, factors=factors, signs=signs, gains=gains, sample_count=N,
+                               speed_of_sound=speed_of_sound, filter_length=filter_length)
+    for b, irs in zip(blocks, _parallel.imap_blocks(synthesize_block, arguments, workers, processes=True)):
+        if len(ir_dimensions) == 3: irs = irs.sum(axis=2)
+        database.Data.IR.set_values(irs, indices={"M": b}, dim_order=ir_dimensions)
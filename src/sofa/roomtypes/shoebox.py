@@ -37,16 +37,20 @@ class Shoebox(_Base):
         super().__init__(database)
         self.standard_dimensions["CornerA"] = [("I", "C"), ("M", "C")]
         self.standard_dimensions["CornerB"] = [("I", "C"), ("M", "C")]
+        self._CornerA = None
+        self._CornerB = None
 
     @property
     def CornerA(self):
         """First corner of room cuboid"""
-        return spatial.Coordinates(self, "CornerA")
+        if self._CornerA is None: self._CornerA = spatial.Coordinates(self, "CornerA")
+        return self._CornerA
 
     @property
     def CornerB(self):
         """Opposite corner of room cuboid"""
-        return spatial.Coordinates(self, "CornerB")
+        if self._CornerB is None: self._CornerB = spatial.Coordinates(self, "CornerB")
+        return self._CornerB
 
     def initialize(self, variances=[], string_length=None):
         """Create the necessary variables and attributes
@@ -64,3 +68,10 @@ class Shoebox(_Base):
         """
         self.CornerA.initialize("CornerA" in variances)
         self.CornerB.initialize("CornerB" in variances)
+
+    def synthesize(self, max_order=10, reflection=0.9, speed_of_sound=343., filter_length=16, block_size=None,
+                   workers=None):
+        """Synthesize Data.IR with the image-source method, see :func:`sofa.roomtypes.imagesource.synthesize`"""
+        from .imagesource import synthesize
+        synthesize(self.database, max_order=max_order, reflection=reflection, speed_of_sound=speed_of_sound,
+                   filter_length=filter_length, block_size=block_size, workers=workers)
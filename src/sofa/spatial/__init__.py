@@ -20,7 +20,17 @@
 
 """
 """
-__all__=["sph2cart", "cart2sph", "Units", "System", "Coordinates", "SpatialObject"]
+__all__=["sph2cart", "cart2sph", "cartesian_to_spherical", "spherical_to_cartesian", "orientation_matrices",
+         "Units", "System", "Coordinates", "SpatialObject",
+         "Triangulation", "DirectionLookup", "hilbert_index", "spatial_order", "reorder_measurements",
+         "resample", "harmonics",
+         "angular_distances", "nearest_neighbour_distances", "find_duplicates", "covering_radius", "grid_statistics"]
 
 from .coordinates import *
 from .spatialobject import *
+from .triangulation import Triangulation
+from .lookup import DirectionLookup
+from .ordering import hilbert_index, spatial_order, reorder_measurements
+from .resampling import resample
+from . import harmonics
+from .grid import angular_distances, nearest_neighbour_distances, find_duplicates, covering_radius, grid_statistics
@@ -19,6 +19,7 @@
 # THE SOFTWARE.
 
 from .. import access
+from .. import _parallel
 import numpy as np
 
 # for coordinate transformations
@@ -93,6 +94,128 @@ def cart2sph(x, y, z):
     return alpha, beta, r
 
 
+def _conversion_output(coords, out):
+    """Copy coordinates into the output array, or a new floating point array preserving the input precision"""
+    if out is None:
+        coords = np.asarray(coords)
+        return np.array(coords, dtype=np.result_type(coords.dtype, np.float32))
+    if out is not coords: np.copyto(out, coords)
+    return out
+
+
+def _angle_factor(angle_unit, to_radians):
+    if angle_unit is None or Units.is_Radians(angle_unit): return None
+    if Units.is_Degree(angle_unit): return np.pi / 180 if to_radians else 180 / np.pi
+    raise Exception("invalid angle unit {0}".format(angle_unit))
+
+
+_conversion_block_size = 8192
+
+
+def _convert_in_place(values, axis, kernel, factor):
+    """Apply a conversion kernel to contiguous blocks of the three coordinate components"""
+    values = np.moveaxis(values, axis, -1)
+    rows = values.view()
+    try:
+        rows.shape = (-1, 3)
+    except AttributeError:  # layout cannot be flattened without copying, convert whole components instead
+        a, b, c = np.moveaxis(values, -1, 0)
+        kernel(a, b, c, np.empty_like(a), factor)
+        return
+    scratch = np.empty((4, min(len(rows), _conversion_block_size)), dtype=values.dtype)
+    for start in range(0, len(rows), _conversion_block_size):
+        block = rows[start:start + _conversion_block_size]
+        a, b, c, t = scratch[:, :len(block)]
+        np.copyto(a, block[:, 0])
+        np.copyto(b, block[:, 1])
+        np.copyto(c, block[:, 2])
+        kernel(a, b, c, t, factor)
+        block[:, 0] = a
+        block[:, 1] = b
+        block[:, 2] = c
+
+
+def _cartesian_to_spherical_kernel(x, y, z, t, factor):
+    np.multiply(x, x, out=t)
+    np.arctan2(y, x, out=x)
+    np.multiply(y, y, out=y)
+    t += y
+    np.sqrt(t, out=y)
+    np.arctan2(z, y, out=y)
+    np.multiply(z, z, out=z)
+    z += t
+    np.sqrt(z, out=z)
+    if factor is not None:
+        x *= factor
+        y *= factor
+
+
+def _spherical_to_cartesian_kernel(alpha, beta, r, t, factor):
+    if factor is not None:
+        alpha *= factor
+        beta *= factor
+    np.cos(beta, out=t)
+    t *= r
+    np.sin(beta, out=beta)
+    r *= beta
+    np.sin(alpha, out=beta)
+    beta *= t
+    np.cos(alpha, out=alpha)
+    alpha *= t
+
+
+def cartesian_to_spherical(coords, out=None, angle_unit=None, axis=-1):
+    """Cartesian to spherical coordinate transform of a coordinate array, see :func:`cart2sph`
+
+    The conversion is performed in place on the output array, in blocks of contiguous temporary components.
+
+    Parameters
+    ----------
+    coords : array_like
+        Cartesian coordinates, dimension "C" of size 3 along axis
+    out : np.ndarray, optional
+        Output array of matching dimensions, may be coords itself, new array preserving float32 precision if not provided
+    angle_unit : str, optional
+        Unit for the azimuth and elevation angles, radians if not provided
+    axis : int, optional
+        Axis of dimension "C"
+
+    Returns
+    -------
+    out : np.ndarray
+        Azimuth, elevation and radius along axis
+    """
+    out = _conversion_output(coords, out)
+    _convert_in_place(out, axis, _cartesian_to_spherical_kernel, _angle_factor(angle_unit, to_radians=False))
+    return out
+
+
+def spherical_to_cartesian(coords, out=None, angle_unit=None, axis=-1):
+    """Spherical to cartesian coordinate transform of a coordinate array, see :func:`sph2cart`
+
+    The conversion is performed in place on the output array, in blocks of contiguous temporary components.
+
+    Parameters
+    ----------
+    coords : array_like
+        Azimuth, elevation and radius, dimension "C" of size 3 along axis
+    out : np.ndarray, optional
+        Output array of matching dimensions, may be coords itself, new array preserving float32 precision if not provided
+    angle_unit : str, optional
+        Unit of the azimuth and elevation angles, radians if not provided
+    axis : int, optional
+        Axis of dimension "C"
+
+    Returns
+    -------
+    out : np.ndarray
+        Cartesian coordinates along axis
+    """
+    out = _conversion_output(coords, out)
+    _convert_in_place(out, axis, _spherical_to_cartesian_kernel, _angle_factor(angle_unit, to_radians=True))
+    return out
+
+
 def transform(u, rot, x0, invert, is_position):
     if not invert and is_position: u = u - x0
     t = rot.apply(u, inverse=not invert)
@@ -107,22 +230,83 @@ def _rotation_from_view_up(view, up):
         view = np.repeat(view, ulen, axis=0)
         up = np.repeat(up, vlen, axis=0)
     y_axis = np.cross(up, view)
-    return Rotation.from_dcm(np.moveaxis(np.asarray([view, y_axis, up]), 0, -1))
+    return _rotation_from_matrix(np.moveaxis(np.asarray([view, y_axis, up]), 0, -1))
+
+
+# Rotation.from_dcm was renamed to Rotation.from_matrix in scipy 1.4.0 and removed in 1.6.0
+_rotation_from_matrix = getattr(Rotation, "from_matrix", None) or Rotation.from_dcm
+
+
+def orientation_matrices(orientations, angle_unit=None):
+    """Rotation matrices of head orientations given as yaw, pitch and roll angles or as quaternions
+
+    Angles are right-handed rotations about the z-, the rotated y- and the twice rotated x-axis of the reference
+    system, so that a positive yaw turns the head to the left and a positive pitch tilts it downwards.
+
+    Parameters
+    ----------
+    orientations : array_like
+        Yaw, pitch and roll angles, dimensions (orientations, 3), or scalar-last quaternions (x, y, z, w),
+        dimensions (orientations, 4)
+    angle_unit : str, optional
+        Unit of the angles, degree if not provided
+
+    Returns
+    -------
+    matrices : np.ndarray
+        Rotation matrices with the rotated x-, y- and z-axes as columns, dimensions (orientations, 3, 3)
+    """
+    orientations = np.atleast_2d(orientations)
+    if orientations.shape[-1] == 4:
+        rotation = Rotation.from_quat(orientations)
+    elif orientations.shape[-1] == 3:
+        degrees = angle_unit is None or Units.is_Degree(angle_unit)
+        rotation = Rotation.from_euler("ZYX", orientations, degrees=degrees)
+    else:
+        raise ValueError("orientations must be given as yaw, pitch, roll or as quaternions, not with dimensions "
+                         "{0}".format(orientations.shape))
+    if hasattr(rotation, "as_matrix"): return rotation.as_matrix()
+    return rotation.as_dcm()
+
+
+def _unit_vectors(directions, system=None, angle_unit=None):
+    """Convert an array of directions with dimensions (..., "C") into cartesian unit vectors"""
+    directions = np.asarray(directions, dtype=float)
+    if system is not None and system != System.Cartesian:
+        if angle_unit is None: angle_unit = Units.Degree
+        dimensions = tuple(str(i) for i in range(directions.ndim - 1)) + ("C",)
+        directions = System.convert(directions, dimensions, system, System.Cartesian, angle_unit, Units.Radians)
+    norm = np.linalg.norm(directions, axis=-1, keepdims=True)
+    if np.any(norm == 0): raise ValueError("cannot determine direction of zero-length vector")
+    return directions / norm
 
 
-def _get_object_transform(ref_object):
+def _varies_along_measurements(obj):
+    """Whether coordinates or the pose of a spatial object change with the measurements"""
+    if obj is None: return False
+    if isinstance(obj, Coordinates): return obj.exists() and "M" in obj.dimensions()
+    return any(_varies_along_measurements(c) for c in [obj.Position, obj.View, obj.Up])
+
+
+def _get_transform_order(ref_object):
     order = ("M", "C")
+    if ref_object is not None and (ref_object.name == "Receiver" or ref_object.name == "Emitter"):
+        ldim = ref_object.Position.get_local_dimension()
+        if ldim not in order:
+            order = (ldim,) + order
+    return order
+
+
+def _get_object_transform(ref_object, indices=None):
+    order = _get_transform_order(ref_object)
     if ref_object is None:
         # global coordinate system
         position = np.asarray([[0, 0, 0]])
         view = np.asarray([[1, 0, 0]])
         up = np.asarray([[0, 0, 1]])
     else:
-        if ref_object.name == "Receiver" or ref_object.name == "Emitter":
-            ldim = ref_object.Position.get_local_dimension()
-            if ldim not in order:
-                order = (ldim,) + order
-        position, view, up = ref_object.get_pose(dim_order=order, system=System.Cartesian)
+        position, view, up = ref_object.get_pose(indices=None if indices is None else dict(indices),
+                                                 dim_order=order, system=System.Cartesian)
 
     if np.size(position.shape) < 3:
         def apply_transform(values, is_position, invert=False):
@@ -174,7 +358,7 @@ class Units:
     _RadiansAliases = {"radians", "rad"}
 
     @staticmethod
-    def convert_angle_units(coords, dimensions, old_units, new_units):
+    def convert_angle_units(coords, dimensions, old_units, new_units, out=None):
         """
         Parameters
         ----------
@@ -186,6 +370,8 @@ class Units:
             Units of the angle values in the array
         new_units : str
             Target angle units
+        out : np.ndarray, optional
+            Output array of matching dimensions, may be coords itself
 
         Returns
         -------
@@ -193,25 +379,25 @@ class Units:
             Array of converted spherical coordinate values in identical dimension order
         """
         if dimensions is None: raise Exception("missing dimension order for unit conversion")
-        if new_units is None: return coords
+        if new_units is None: return coords if out is None else _conversion_output(coords, out)
         if old_units is None: raise Exception("missing original unit for unit conversion")
 
         new_units = new_units.split((" "))[0].split((","))[0]
 
-        conversion = np.ones_like(coords)
-        indices = access.get_slice_tuple(dimensions, {"C": slice(2)})
-
         if (Units.is_Degree(old_units) and Units.is_Degree(new_units)) or \
                 (Units.is_Radians(old_units) and Units.is_Radians(new_units)):
-            return coords
+            return coords if out is None else _conversion_output(coords, out)
         elif Units.is_Degree(old_units) and Units.is_Radians(new_units):
-            conversion[indices] = np.pi / 180
+            factor = np.pi / 180
         elif Units.is_Radians(old_units) and Units.is_Degree(new_units):
-            conversion[indices] = 180 / np.pi
+            factor = 180 / np.pi
         else:
             raise Exception("invalid angle unit in conversion from {0} to {1}".format(old_units, new_units))
 
-        return np.multiply(coords, conversion)
+        new_coords = _conversion_output(coords, out)
+        angles = new_coords[access.get_slice_tuple(dimensions, {"C": slice(2)})]
+        np.multiply(angles, factor, out=angles)
+        return new_coords
 
 
 class System:
@@ -221,7 +407,7 @@ class System:
 
     @staticmethod
     def convert(coords, dimensions, old_system, new_system, old_angle_unit=None,
-                new_angle_unit=None):  # need to take care of degree/radians unit mess.
+                new_angle_unit=None, out=None, chunk_size=None, workers=None):  # need to take care of degree/radians unit mess.
         """
         Parameters
         ----------
@@ -237,35 +423,42 @@ class System:
             Unit of the angular spherical coordinates
         new_angle_unit : str, optional
             Target unit of the angular spherical coordinates
+        out : np.ndarray, optional
+            Output array of matching dimensions, may be coords itself
+        chunk_size : int, optional
+            Convert chunks of this size along dimension "M" (or the first dimension other than "C") on a thread pool
+        workers : int, optional
+            Number of worker threads for chunked conversion
 
         Returns
         -------
         new_coords : np.ndarray
-            Array of converted coordinate values in identical dimension order
+            Array of converted coordinate values in identical dimension order, float32 input precision is preserved
         """
         if dimensions is None: raise Exception("missing dimension order for coordinate conversion")
+        if chunk_size is not None and len(dimensions) > 1:
+            coords = np.asarray(coords)
+            if out is None: out = np.empty(coords.shape, dtype=np.result_type(coords.dtype, np.float32))
+            axis = dimensions.index("M") if "M" in dimensions else [d != "C" for d in dimensions].index(True)
+
+            def convert_chunk(block):
+                sl = (slice(None),) * axis + (block,)
+                System.convert(coords[sl], dimensions, old_system, new_system, old_angle_unit, new_angle_unit,
+                               out=out[sl])
+
+            _parallel.map_blocks(convert_chunk, _parallel.block_slices(0, coords.shape[axis], chunk_size), workers)
+            return out
         if new_system is None or old_system == new_system:
-            if old_system != System.Spherical: return coords
-            return Units.convert_angle_units(coords, dimensions, old_angle_unit, new_angle_unit)
-        old = None
-        conversion = None
+            if old_system != System.Spherical: return coords if out is None else _conversion_output(coords, out)
+            return Units.convert_angle_units(coords, dimensions, old_angle_unit, new_angle_unit, out=out)
+        c_axis = dimensions.index("C")
         if old_system == System.Cartesian and new_system == System.Spherical:
-            conversion = cart2sph
-            old = coords
+            if new_angle_unit is not None: new_angle_unit = Units.first_unit(new_angle_unit)
+            return cartesian_to_spherical(coords, out, new_angle_unit, axis=c_axis)
         elif old_system == System.Spherical and new_system == System.Cartesian:
-            conversion = sph2cart
-            old = Units.convert_angle_units(coords, dimensions, old_angle_unit, Units.Radians)
-        else:
-            raise Exception("unknown coordinate conversion from {0} to {1}".format(old_system, new_system))
-        c_axis = dimensions.index("C")
-        # a, b, c = np.split(old, 3, c_axis)
-        a = old[access.get_slice_tuple(dimensions, {"C": 0})]
-        b = old[access.get_slice_tuple(dimensions, {"C": 1})]
-        c = old[access.get_slice_tuple(dimensions, {"C": 2})]
-        new = np.moveaxis(np.asarray(conversion(a, b, c)), 0, c_axis)
-
-        if new_system != System.Spherical: return new
-        return Units.convert_angle_units(new, dimensions, Units.Radians, new_angle_unit)
+            if old_angle_unit is None: raise Exception("missing original unit for unit conversion")
+            return spherical_to_cartesian(coords, out, Units.first_unit(old_angle_unit), axis=c_axis)
+        raise Exception("unknown coordinate conversion from {0} to {1}".format(old_system, new_system))
 
 
 class Coordinates(access.Variable):
@@ -360,7 +553,54 @@ class Coordinates(access.Variable):
                               self.Type, system,
                               old_angle_unit, angle_unit)
 
-    def get_global_values(self, indices=None, dim_order=None, system=None, angle_unit=None):
+    def get_rotated_values(self, orientations, ref_object, indices=None, dim_order=None, system=None,
+                           angle_unit=None, orientation_unit=None):
+        """Transform coordinates into the reference system of a given :class:`sofa.spatial.SpatialObject` that is
+        additionally rotated by each of the given orientations, e.g. Source positions relative to a head-tracked Listener.
+        The database is not modified.
+
+        Parameters
+        ----------
+        orientations : array_like
+            Yaw, pitch and roll angles, dimensions (orientations, 3), or scalar-last quaternions, dimensions
+            (orientations, 4), applied on top of View and Up of ref_object, see :func:`sofa.spatial.orientation_matrices`
+        ref_object : :class:`sofa.spatial.SpatialObject`
+            Spatial object providing the reference system, None for the global reference system
+        indices : dict(key:str, value:int or slice), optional
+            Key: dimension name, value: indices to be returned, complete axis assumed if not provided
+        dim_order : tuple of str, optional
+            Desired order of dimensions in the output array, excluding the leading orientation dimension
+        system : str, optional
+            Target coordinate system
+        angle_unit : str, optional
+            Unit for spherical angles in the output array
+        orientation_unit : str, optional
+            Unit of the orientation angles, degree if not provided
+
+        Returns
+        -------
+        rotated_values : np.ndarray
+            Transformed coordinates, dimensions (orientations,) + dim_order
+        """
+        if system is None: system = self.Type
+        if dim_order is None: dim_order = access.get_default_dimension_order(self.dimensions(), indices)
+        if "C" not in dim_order:
+            raise ValueError("dimension 'C' required in dim_order to rotate {0}".format(self.name))
+        matrices = orientation_matrices(orientations, orientation_unit)
+
+        values = self.get_relative_values(ref_object, indices, dim_order, System.Cartesian)
+        values = np.moveaxis(values, dim_order.index("C"), -1)
+        # row vectors times rotation matrix apply the inverse rotation, i.e. into the rotated reference system
+        rotated = np.matmul(values.reshape(-1, 3), matrices).reshape((len(matrices),) + values.shape)
+        rotated = np.moveaxis(rotated, -1, dim_order.index("C") + 1)
+
+        if system == System.Spherical and angle_unit is None:
+            angle_unit = self.Units.split(",")[0] if self.Type == System.Spherical else Units.Degree
+        return System.convert(rotated, ("orientations",) + tuple(dim_order), System.Cartesian, system,
+                              new_angle_unit=angle_unit, out=rotated)
+
+    def get_global_values(self, indices=None, dim_order=None, system=None, angle_unit=None, out=None,
+                          chunk_size=None, workers=None):
         """Transform local coordinates (such as Receiver or Emitter) into the global reference system
 
         Parameters
@@ -373,15 +613,23 @@ class Coordinates(access.Variable):
             Target coordinate system
         angle_unit : str, optional
             Unit for spherical angles in the output array
+        out : np.ndarray, optional
+            Preallocated output array
+        chunk_size : int, optional
+            Transform chunks of this many measurements on a thread pool, bounding the size of temporary arrays
+        workers : int, optional
+            Number of worker threads for chunked transforms
 
         Returns
         -------
         global_values : np.ndarray
             Transformed coordinates in global reference system
         """
-        return self.get_relative_values(None, indices, dim_order, system, angle_unit)
+        return self.get_relative_values(None, indices, dim_order, system, angle_unit, out=out, chunk_size=chunk_size,
+                                        workers=workers)
 
-    def get_relative_values(self, ref_object, indices=None, dim_order=None, system=None, angle_unit=None):
+    def get_relative_values(self, ref_object, indices=None, dim_order=None, system=None, angle_unit=None,
+                            out=None, chunk_size=None, workers=None):
         """Transform coordinates (such as Receiver or Emitter) into the reference system of a given :class:`sofa.spatial.SpatialObject`, aligning the x-axis with View and the z-axis with Up
 
         Parameters
@@ -396,37 +644,60 @@ class Coordinates(access.Variable):
             Target coordinate system
         angle_unit : str, optional
             Unit for spherical angles in the output array
+        out : np.ndarray, optional
+            Preallocated output array
+        chunk_size : int, optional
+            Transform chunks of this many measurements on a thread pool, bounding the size of temporary arrays
+        workers : int, optional
+            Number of worker threads for chunked transforms
 
         Returns
         -------
         relative_values : np.ndarray
             Transformed coordinates in original or provided reference system
         """
+        if chunk_size is not None:
+            return self._get_relative_values_chunked(ref_object, indices, dim_order, system, angle_unit, out,
+                                                     chunk_size, workers)
         if system is None: system = self.Type
         ldim = self.get_local_dimension()
-
-        # get transforms
-        anchor_transform, at_order = _get_object_transform(self.get_global_reference_object())
-        ref_transform, rt_order = _get_object_transform(ref_object)
+        indices = None if indices is None else dict(indices)
+
+        # only read the requested measurements, the index along "M" is applied to the read values afterwards
+        read_indices = None
+        if indices is not None and "M" in indices:
+            if access.is_integer(indices["M"]):
+                read_indices = {"M": slice(indices["M"], indices["M"] + 1)}
+                indices["M"] = 0
+            else:
+                read_indices = {"M": indices["M"]}
+                indices["M"] = slice(None)
+
+        with access.dataset_lock:
+            # get transforms
+            anchor_transform, at_order = _get_object_transform(self.get_global_reference_object(), read_indices)
+            ref_transform, rt_order = _get_object_transform(ref_object, read_indices)
+            read_order = at_order if ldim is None else (ldim,) + at_order
+            original_values = self.get_values(indices=None if read_indices is None else dict(read_indices),
+                                              dim_order=read_order, system=System.Cartesian)
+            ctype, units, dimensions = self.Type, self.Units, self.dimensions()
         is_position = self._descriptor not in ["View", "Up"]
 
         # transform values
         if ldim is None:
-            original_values = self.get_values(dim_order=at_order, system=System.Cartesian)
             transformed_values = ref_transform(anchor_transform(original_values, is_position, invert=True), is_position)
             order = rt_order
         else:
-            original_values_stack = self.get_values(dim_order=(ldim,) + at_order, system=System.Cartesian)
             transformed_values = np.asarray(
-                [ref_transform(anchor_transform(original_values, is_position, invert=True), is_position) for original_values in
-                 original_values_stack])
+                [ref_transform(anchor_transform(values, is_position, invert=True), is_position) for values in
+                 original_values])
             order = (ldim,) + rt_order
 
         # return in proper system, units and order
         if system == System.Spherical and angle_unit is None:
-            angle_unit = self.Units.split(",")[0] if self.Type == System.Spherical else Units.Degree
+            angle_unit = units.split(",")[0] if ctype == System.Spherical else Units.Degree
 
-        default_dimensions = self.dimensions()
+        default_dimensions = dimensions
         if len(rt_order) > 2: default_dimensions = (rt_order[0],) + default_dimensions
 
         if dim_order is None: dim_order = access.get_default_dimension_order(default_dimensions, indices)
@@ -436,15 +707,58 @@ class Coordinates(access.Variable):
                                                                indices=indices, dim_order=dim_order),
                                   dim_order,
                                   System.Cartesian, system,
-                                  new_angle_unit=angle_unit)
+                                  new_angle_unit=angle_unit, out=out)
         else:  # only apply "C" index after coordinate system conversion!
-            return System.convert(access.get_values_from_array(transformed_values, order,
-                                                               indices={i: indices[i] for i in indices if
-                                                                        i != "C"},
-                                                               dim_order=("C",) + dim_order),
-                                  ("C",) + dim_order,
-                                  System.Cartesian, system,
-                                  new_angle_unit=angle_unit)[indices["C"]]
+            values = System.convert(access.get_values_from_array(transformed_values, order,
+                                                                 indices={i: indices[i] for i in indices if
+                                                                          i != "C"},
+                                                                 dim_order=("C",) + dim_order),
+                                    ("C",) + dim_order,
+                                    System.Cartesian, system,
+                                    new_angle_unit=angle_unit)[indices["C"]]
+            if out is None: return values
+            out[...] = values
+            return out
+
+    def _get_relative_values_chunked(self, ref_object, indices, dim_order, system, angle_unit, out, chunk_size,
+                                     workers):
+        indices = dict() if indices is None else dict(indices)
+        measurements = indices.pop("M", slice(None))
+        if access.is_integer(measurements) or not isinstance(measurements, slice):
+            return self.get_relative_values(ref_object, dict(indices, M=measurements), dim_order, system,
+                                            angle_unit, out)
+        # values of objects fixed for all measurements are transformed at once
+        if not any(_varies_along_measurements(obj) for obj in [self, self.get_global_reference_object(), ref_object]):
+            return self.get_relative_values(ref_object, dict(indices, M=measurements), dim_order, system,
+                                            angle_unit, out)
+        start, stop, step = measurements.indices(self.database.Dimensions.M)
+        if step != 1: raise ValueError("chunked transforms require a contiguous range of measurements")
+        blocks = _parallel.block_slices(start, stop, chunk_size)
+
+        # without a preallocated output, the first chunk determines its type
+        first = None
+        if out is None:
+            first = self.get_relative_values(ref_object, dict(indices, M=blocks[0]), dim_order, system, angle_unit)
+        if dim_order is None:
+            default_dimensions = self.dimensions()
+            ref_order = _get_transform_order(ref_object)
+            if len(ref_order) > 2: default_dimensions = (ref_order[0],) + default_dimensions
+            dim_order = access.get_default_dimension_order(default_dimensions, dict(indices, M=blocks[0]))
+        axis = dim_order.index("M") if "M" in dim_order else dim_order.index("I")
+        if out is None:
+            shape = list(first.shape)
+            shape[axis] = stop - start
+            out = np.empty(shape, dtype=first.dtype)
+
+        def transform_chunk(block):
+            target = out[(slice(None),) * axis + (slice(block.start - start, block.stop - start),)]
+            if first is not None and block is blocks[0]:
+                target[...] = first
+                return
+            self.get_relative_values(ref_object, dict(indices, M=block), dim_order, system, angle_unit, out=target)
+
+        _parallel.map_blocks(transform_chunk, blocks, workers)
+        return out
 
     def set_system(self, ctype=None, cunits=None):
         """Set the coordinate Type and Units"""
@@ -478,6 +792,7 @@ class Coordinates(access.Variable):
         """
         if not self.exists():
             raise Exception("failed to set values of {0}, variable not initialized".format(self.name))
+        self.database._spatial_cache.clear()
 
         if system is None: system = self.Type
         if angle_unit is None: angle_unit = self.Units
@@ -0,0 +1,231 @@
+# Copyright (c) 2019 Jannika Lossner
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""Great-circle distances and quality metrics of direction grids, computed in memory-bounded tiles.
+"""
+import numpy as np
+try:
+    from scipy.spatial import QhullError
+except ImportError:  # scipy < 1.8
+    from scipy.spatial.qhull import QhullError
+
+from .. import _parallel
+from .coordinates import _unit_vectors
+from .triangulation import Triangulation
+
+
+def _tile_distances(a, b):
+    """Great-circle distances in radians between two sets of unit vectors, from their chord lengths"""
+    chord = np.linalg.norm(a[:, None, :] - b[None, :, :], axis=-1)
+    np.multiply(chord, 0.5, out=chord)
+    np.clip(chord, 0, 1, out=chord)
+    np.arcsin(chord, out=chord)
+    return np.multiply(chord, 2, out=chord)
+
+
+def angular_distances(directions, other=None, tile_size=512, workers=None, out=None, system=None, angle_unit=None):
+    """Pairwise great-circle distances
+
+    Parameters
+    ----------
+    directions : array_like
+        Directions, dimensions ("M", "C")
+    other : array_like, optional
+        Second set of directions, directions if not provided
+    tile_size : int, optional
+        Number of directions per tile side, bounds the size of temporary arrays
+    workers : int, optional
+        Number of worker threads computing tiles
+    out : np.ndarray, optional
+        Preallocated output array, e.g. a :class:`numpy.memmap` for large grids
+    system : str, optional
+        Coordinate system of the directions, cartesian if not provided
+    angle_unit : str, optional
+        Unit for spherical angles of the directions, degree if not provided
+
+    Returns
+    -------
+    distances : np.ndarray
+        Distances in radians, dimensions (directions, other)
+    """
+    a = _unit_vectors(directions, system, angle_unit)
+    b = a if other is None else _unit_vectors(other, system, angle_unit)
+    if out is None: out = np.empty((len(a), len(b)))
+
+    def compute_rows(rows):
+        for columns in _parallel.block_slices(0, len(b), tile_size):
+            out[rows, columns] = _tile_distances(a[rows], b[columns])
+
+    _parallel.map_blocks(compute_rows, _parallel.block_slices(0, len(a), tile_size), workers)
+    return out
+
+
+def nearest_neighbour_distances(directions, tile_size=512, workers=None, system=None, angle_unit=None):
+    """Great-circle distance of each direction to its nearest other direction, without the full distance matrix
+
+    Parameters
+    ----------
+    directions : array_like
+        Directions, dimensions ("M", "C")
+    tile_size : int, optional
+        Number of directions per tile side, bounds the size of temporary arrays
+    workers : int, optional
+        Number of worker threads computing tiles
+    system : str, optional
+        Coordinate system of the directions, cartesian if not provided
+    angle_unit : str, optional
+        Unit for spherical angles of the directions, degree if not provided
+
+    Returns
+    -------
+    distances, neighbours : np.ndarray, np.ndarray
+        Distances in radians and indices of the nearest neighbours, dimensions ("M",)
+    """
+    p = _unit_vectors(directions, system, angle_unit)
+    if len(p) < 2: raise ValueError("nearest neighbours require at least 2 directions")
+    distances = np.full(len(p), np.inf)
+    neighbours = np.zeros(len(p), dtype=int)
+
+    def compute_rows(rows):
+        row_ids = np.arange(rows.start, rows.stop)
+        for columns in _parallel.block_slices(0, len(p), tile_size):
+            tile = _tile_distances(p[rows], p[columns])
+            if columns.start < rows.stop and rows.start < columns.stop:  # exclude the directions themselves
+                own = (row_ids >= columns.start) & (row_ids < columns.stop)
+                tile[own, row_ids[own] - columns.start] = np.inf
+            best = np.argmin(tile, axis=1)
+            best_distances = tile[np.arange(len(tile)), best]
+            closer = best_distances < distances[rows]
+            distances[rows][closer] = best_distances[closer]
+            neighbours[rows][closer] = best[closer] + columns.start
+
+    _parallel.map_blocks(compute_rows, _parallel.block_slices(0, len(p), tile_size), workers)
+    return distances, neighbours
+
+
+def find_duplicates(directions, tolerance=1e-6, tile_size=512, workers=None, system=None, angle_unit=None):
+    """Pairs of directions closer than a tolerance
+
+    Parameters
+    ----------
+    directions : array_like
+        Directions, dimensions ("M", "C")
+    tolerance : float, optional
+        Great-circle distance in radians below which directions are considered duplicates
+    tile_size : int, optional
+        Number of directions per tile side, bounds the size of temporary arrays
+    workers : int, optional
+        Number of worker threads computing tiles
+    system : str, optional
+        Coordinate system of the directions, cartesian if not provided
+    angle_unit : str, optional
+        Unit for spherical angles of the directions, degree if not provided
+
+    Returns
+    -------
+    pairs : np.ndarray
+        Index pairs (i, j) with i < j, dimensions (pairs, 2)
+    """
+    p = _unit_vectors(directions, system, angle_unit)
+
+    def compute_rows(rows):
+        found = []
+        for columns in _parallel.block_slices(rows.start, len(p), tile_size):
+            i, j = np.nonzero(_tile_distances(p[rows], p[columns]) <= tolerance)
+            i += rows.start
+            j += columns.start
+            found.append(np.stack([i[i < j], j[i < j]], axis=-1))
+        return np.concatenate(found) if found else np.empty((0, 2), dtype=int)
+
+    pairs = _parallel.map_blocks(compute_rows, _parallel.block_slices(0, len(p), tile_size), workers)
+    return np.concatenate(pairs) if pairs else np.empty((0, 2), dtype=int)
+
+
+def covering_radius(triangulation):
+    """Largest great-circle distance from any direction on the sphere to the nearest triangulation vertex, given by
+    the largest circumradius of the triangles
+
+    Parameters
+    ----------
+    triangulation : :class:`sofa.spatial.Triangulation`
+
+    Returns
+    -------
+    radius : float
+        Covering radius in radians
+    """
+    a, b, c = np.moveaxis(triangulation.vertices[triangulation.simplices], 1, 0)
+    normals = np.cross(b - a, c - a)
+    normals /= np.linalg.norm(normals, axis=-1, keepdims=True)
+    # orient normals away from the hull interior, the empty cap of each triangle lies on that side
+    outward = np.einsum("tc,tc->t", normals, a - triangulation.vertices.mean(axis=0)) >= 0
+    normals[~outward] *= -1
+    cosines = np.einsum("tc,tc->t", normals, a)
+    return float(np.arccos(np.clip(cosines.min(), -1, 1)))
+
+
+def grid_statistics(directions, tolerance=1e-6, tile_size=512, workers=None, system=None, angle_unit=None):
+    """Summary of the spacing and coverage of a direction grid
+
+    Parameters
+    ----------
+    directions : array_like
+        Directions, dimensions ("M", "C")
+    tolerance : float, optional
+        Great-circle distance in radians below which directions are considered duplicates
+    tile_size : int, optional
+        Number of directions per tile side, bounds the size of temporary arrays
+    workers : int, optional
+        Number of worker threads computing tiles
+    system : str, optional
+        Coordinate system of the directions, cartesian if not provided
+    angle_unit : str, optional
+        Unit for spherical angles of the directions, degree if not provided
+
+    Returns
+    -------
+    statistics : dict
+        "count", "duplicates" (number of duplicate pairs), "nearest_min", "nearest_mean", "nearest_max" and
+        "nearest_std" (nearest neighbour distances), "covering_radius", "elevation_min" and "elevation_max",
+        angles in degree
+    """
+    p = _unit_vectors(directions, system, angle_unit)
+    distances, _ = nearest_neighbour_distances(p, tile_size, workers)
+    duplicates = find_duplicates(p, tolerance, tile_size, workers)
+    unique = np.setdiff1d(np.arange(len(p)), duplicates[:, 1])
+    try:
+        triangulation = Triangulation(p[unique])
+    except (QhullError, ValueError):  # degenerate grids without a proper triangulation
+        radius = np.nan
+    else:
+        radius = float(np.degrees(covering_radius(triangulation)))
+    elevation = np.degrees(np.arcsin(np.clip(p[:, 2], -1, 1)))
+    return {
+        "count": len(p),
+        "duplicates": len(duplicates),
+        "nearest_min": float(np.degrees(distances.min())),
+        "nearest_mean": float(np.degrees(distances.mean())),
+        "nearest_max": float(np.degrees(distances.max())),
+        "nearest_std": float(np.degrees(distances.std())),
+        "covering_radius": radius,
+        "elevation_min": float(elevation.min()),
+        "elevation_max": float(elevation.max()),
+    }
@@ -0,0 +1,243 @@
+# Copyright (c) 2019 Jannika Lossner
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""Real spherical harmonic basis and batched decomposition of measurements.
+"""
+import hashlib
+
+import numpy as np
+from scipy import special
+
+from .coordinates import _unit_vectors
+
+_matrix_cache = dict()
+_matrix_cache_size = 32
+
+
+def _cached(kind, directions, *args):
+    key = (kind, hashlib.sha1(directions.tobytes()).hexdigest(), directions.shape) + args
+    return _matrix_cache.get(key), key
+
+
+def _store(key, matrix):
+    if len(_matrix_cache) >= _matrix_cache_size: _matrix_cache.pop(next(iter(_matrix_cache)))
+    matrix.flags.writeable = False
+    _matrix_cache[key] = matrix
+    return matrix
+
+
+def coefficient_count(order):
+    """Number of spherical harmonic coefficients up to the given order"""
+    return (order + 1) ** 2
+
+
+def sh_basis(directions, order, system=None, angle_unit=None):
+    r"""Real, orthonormal spherical harmonics in ACN order
+
+    .. math::
+        Y_n^m(\alpha, \beta) = N_n^{|m|} P_n^{|m|}(\sin \beta)
+        \begin{cases} \cos(m \alpha) & m > 0 \\ 1 & m = 0 \\ \sin(|m| \alpha) & m < 0 \end{cases}
+
+    with associated Legendre functions :math:`P_n^m` without Condon-Shortley phase and normalisation
+    :math:`N_n^{|m|}` such that the basis functions are orthonormal on the unit sphere. Matrices are cached per
+    grid and order.
+
+    Parameters
+    ----------
+    directions : array_like
+        Directions, dimensions ("M", "C")
+    order : int
+        Maximum spherical harmonic order
+    system : str, optional
+        Coordinate system of the directions, cartesian if not provided
+    angle_unit : str, optional
+        Unit for spherical angles of the directions, degree if not provided
+
+    Returns
+    -------
+    basis : np.ndarray
+        Read-only basis matrix, dimensions (directions, (order + 1) ** 2), coefficient index n ** 2 + n + m
+    """
+    p = _unit_vectors(directions, system, angle_unit)
+    basis, key = _cached("basis", p, order)
+    if basis is not None: return basis
+
+    azimuth = np.arctan2(p[:, 1], p[:, 0])
+    sin_elevation = np.clip(p[:, 2], -1, 1)
+    basis = np.empty((len(p), coefficient_count(order)))
+    for n in range(order + 1):
+        for m in range(n + 1):
+            norm = np.sqrt((2 * n + 1) / (4 * np.pi) * np.exp(special.gammaln(n - m + 1) - special.gammaln(n + m + 1)))
+            legendre = (-1) ** m * norm * special.lpmv(m, n, sin_elevation)
+            if m == 0:
+                basis[:, n * n + n] = legendre
+            else:
+                basis[:, n * n + n + m] = np.sqrt(2) * legendre * np.cos(m * azimuth)
+                basis[:, n * n + n - m] = np.sqrt(2) * legendre * np.sin(m * azimuth)
+    return _store(key, basis)
+
+
+def decomposition_matrix(directions, order, regularization=0, system=None, angle_unit=None):
+    """Regularised least-squares decomposition matrix :math:`(Y^T Y + \\lambda I)^{-1} Y^T`, cached per grid, order
+    and regularization
+
+    Parameters
+    ----------
+    directions : array_like
+        Directions, dimensions ("M", "C")
+    order : int
+        Maximum spherical harmonic order
+    regularization : float, optional
+        Tikhonov regularization :math:`\\lambda`, pseudo-inverse if 0
+    system : str, optional
+        Coordinate system of the directions, cartesian if not provided
+    angle_unit : str, optional
+        Unit for spherical angles of the directions, degree if not provided
+
+    Returns
+    -------
+    matrix : np.ndarray
+        Read-only decomposition matrix, dimensions ((order + 1) ** 2, directions)
+    """
+    p = _unit_vectors(directions, system, angle_unit)
+    matrix, key = _cached("decomposition", p, order, float(regularization))
+    if matrix is not None: return matrix
+    u, s, vt = np.linalg.svd(sh_basis(p, order), full_matrices=False)
+    if regularization > 0:
+        inverse = s / (s ** 2 + regularization)
+    else:
+        inverse = np.where(s > s.max() * max(u.shape) * np.finfo(float).eps, 1 / s, 0)
+    return _store(key, (vt.T * inverse) @ u.T)
+
+
+def decompose(values, directions, order, regularization=0, axis=0, out=None, system=None, angle_unit=None):
+    """Spherical harmonic coefficients of values sampled at the given directions
+
+    Parameters
+    ----------
+    values : array_like
+        Sampled values, real or complex, with the directions along axis
+    directions : array_like
+        Directions, dimensions ("M", "C")
+    order : int
+        Maximum spherical harmonic order
+    regularization : float, optional
+        Tikhonov regularization, pseudo-inverse if 0
+    axis : int, optional
+        Axis of the directions in values, replaced by the coefficients in the result
+    out : np.ndarray, optional
+        Preallocated output array
+    system : str, optional
+        Coordinate system of the directions, cartesian if not provided
+    angle_unit : str, optional
+        Unit for spherical angles of the directions, degree if not provided
+
+    Returns
+    -------
+    coefficients : np.ndarray
+        Coefficients with (order + 1) ** 2 entries along axis
+    """
+    matrix = decomposition_matrix(directions, order, regularization, system, angle_unit)
+    values = np.moveaxis(np.asarray(values), axis, 0)
+    shape = values.shape
+    if out is not None:
+        target = np.moveaxis(out, axis, 0)
+        target[...] = (matrix @ values.reshape(shape[0], -1)).reshape((len(matrix),) + shape[1:])
+        return out
+    return np.moveaxis((matrix @ values.reshape(shape[0], -1)).reshape((len(matrix),) + shape[1:]), 0, axis)
+
+
+def decompose_database(database, order, regularization=0, spatial_object=None, ref_object=None, block_size=None,
+                       out=None):
+    """Spherical harmonic coefficients per frequency bin of all measurements of a FIR, FIRE or TF database
+
+    Directions are given by the Source positions as seen from the Listener (e.g. HRTF sets, decomposed along M), or
+    by the Receiver positions (e.g. SingleRoomDRIR microphone arrays, decomposed along R). The decomposition is
+    computed for blocks of frequency bins, impulse responses are transformed block by block along M and only the
+    bins of the current block are kept, so that temporary arrays are bounded by the block size.
+
+    Parameters
+    ----------
+    database : :class:`sofa.Database`
+        Database of DataType FIR, FIRE or TF
+    order : int
+        Maximum spherical harmonic order
+    regularization : float, optional
+        Tikhonov regularization, pseudo-inverse if 0
+    spatial_object : :class:`sofa.spatial.SpatialObject`, optional
+        Source (along M) or Receiver (along R, positions of the first measurement), Source if not provided
+    ref_object : :class:`sofa.spatial.SpatialObject`, optional
+        Spatial object providing the reference system, Listener if not provided
+    block_size : int, optional
+        Number of frequency bins decomposed at once, all if not provided
+    out : np.ndarray, optional
+        Preallocated complex output array
+
+    Returns
+    -------
+    coefficients, frequencies : np.ndarray, np.ndarray
+        Complex coefficients with (order + 1) ** 2 entries replacing dimension M or R of the data, frequency bins last,
+        and the frequencies of the bins in hertz
+    """
+    from .. import _derive
+
+    if spatial_object is None: spatial_object = database.Source
+    if ref_object is None: ref_object = database.Listener
+    if spatial_object.name == "Receiver":
+        directions = spatial_object.get_relative_directions(ref_object, indices={"M": 0})
+        dim = "R"
+    else:
+        directions = spatial_object.get_relative_directions(ref_object)
+        dim = "M"
+    data = database.Data
+    count = database.Dimensions.N
+
+    if data.Type == "TF":
+        parts = [data.Real, data.Imag]
+        frequencies = data.N.get_values()
+    else:
+        parts = [data.IR]
+        rate = data.SamplingRate.get_values(indices={"M": 0})
+        frequencies = np.fft.rfftfreq(count, 1 / rate)
+    dimensions = parts[0].dimensions()
+    axis = dimensions.index(dim)
+    if len(directions) != parts[0].shape[axis]:
+        raise ValueError("{0} positions do not vary along dimension {1}".format(spatial_object.name, dim))
+
+    bins = len(frequencies)
+    if block_size is None: block_size = bins
+    shape = list(parts[0].shape)
+    shape[axis] = coefficient_count(order)
+    shape[-1] = bins
+    if out is None: out = np.empty(shape, dtype=complex)
+    if data.Type != "TF": measurement_size = _derive.measurement_block_size(database.dataset[parts[0].name])
+
+    for start in range(0, bins, block_size):
+        band = slice(start, min(start + block_size, bins))
+        if data.Type == "TF":
+            values = parts[0].get_values(indices={"N": band}) + 1j * parts[1].get_values(indices={"N": band})
+        else:  # spectra of the band, transformed block by block along M
+            values = np.empty(parts[0].shape[:-1] + (band.stop - band.start,), dtype=complex)
+            for block in range(0, values.shape[0], measurement_size):
+                measurements = slice(block, min(block + measurement_size, values.shape[0]))
+                values[measurements] = np.fft.rfft(parts[0].get_values(indices={"M": measurements}), axis=-1)[..., band]
+        decompose(values, directions, order, regularization, axis, out=out[..., band])
+    return out, frequencies
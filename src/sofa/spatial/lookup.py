@@ -0,0 +1,227 @@
+# Copyright (c) 2019 Jannika Lossner
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""Quantised direction lookup tables for constant-time measurement selection.
+"""
+import numpy as np
+from scipy.spatial import cKDTree
+
+from .coordinates import Units, sph2cart, _unit_vectors
+
+
+class DirectionLookup:
+    """Table of measurement indices over a regular azimuth/elevation grid
+
+    Each grid cell stores the index of the measurement nearest to the cell centre or, for interpolating tables,
+    the three measurement indices of the surrounding triangle. The table is a flat integer array, so that queries
+    reduce to index arithmetic and can be performed into preallocated output arrays.
+
+    Parameters
+    ----------
+    table : np.ndarray
+        Integer table, dimensions (elevation cells, azimuth cells) or (elevation cells, azimuth cells, 3)
+    """
+
+    def __init__(self, table):
+        if table.ndim not in (2, 3): raise ValueError("invalid lookup table dimensions {0}".format(table.shape))
+        self._table = table
+        self._elevation_cells, self._azimuth_cells = table.shape[:2]
+        if self._elevation_cells < 2: raise ValueError("lookup table requires at least 2 elevation cells")
+        self._cells = table.reshape((self._elevation_cells * self._azimuth_cells,) + table.shape[2:])
+        self._azimuth_resolution = 360 / self._azimuth_cells
+        self._elevation_resolution = 180 / (self._elevation_cells - 1)
+        self._buffers = None
+
+    @staticmethod
+    def grid(resolution):
+        """Cell centres of a lookup table with the given resolution
+
+        Parameters
+        ----------
+        resolution : float or tuple of float
+            Grid resolution in degree, or tuple of (azimuth, elevation) resolution
+
+        Returns
+        -------
+        azimuth, elevation : np.ndarray, np.ndarray
+            Cell centre angles in degree, dimensions (elevation cells, azimuth cells)
+        """
+        azimuth_resolution, elevation_resolution = np.broadcast_to(resolution, (2,))
+        azimuth_cells = max(int(round(360 / azimuth_resolution)), 1)
+        elevation_cells = max(int(round(180 / elevation_resolution)), 1) + 1
+        return np.meshgrid(np.arange(azimuth_cells) * 360 / azimuth_cells,
+                           np.arange(elevation_cells) * 180 / (elevation_cells - 1) - 90)
+
+    @staticmethod
+    def from_directions(directions, resolution=1, triangulation=None, system=None, angle_unit=None):
+        """Build a lookup table for a set of measurement directions
+
+        Parameters
+        ----------
+        directions : array_like
+            Measurement directions, dimensions ("M", "C")
+        resolution : float or tuple of float, optional
+            Grid resolution in degree, or tuple of (azimuth, elevation) resolution
+        triangulation : :class:`sofa.spatial.Triangulation`, optional
+            Triangulation of the directions, store the surrounding triangle vertices instead of the nearest direction
+        system : str, optional
+            Coordinate system of the directions, cartesian if not provided
+        angle_unit : str, optional
+            Unit for spherical angles of the directions, degree if not provided
+
+        Returns
+        -------
+        lookup : :class:`sofa.spatial.DirectionLookup`
+        """
+        directions = _unit_vectors(directions, system, angle_unit)
+        azimuth, elevation = DirectionLookup.grid(resolution)
+        centres = np.stack(sph2cart(np.deg2rad(azimuth), np.deg2rad(elevation), 1), axis=-1)
+        dtype = np.int32 if len(directions) < np.iinfo(np.int32).max else np.int64
+        if triangulation is None:
+            _, table = cKDTree(directions).query(centres)
+        else:
+            table, _ = triangulation.interpolation_weights(centres)
+        return DirectionLookup(np.ascontiguousarray(table, dtype=dtype))
+
+    @staticmethod
+    def from_object(spatial_object, ref_object=None, resolution=1, interpolate=False, indices=None):
+        """Build a lookup table for the positions of a spatial object as seen from a reference object, e.g.
+        `DirectionLookup.from_object(database.Source, database.Listener)` for the measurements of an HRTF set
+
+        Parameters
+        ----------
+        spatial_object : :class:`sofa.spatial.SpatialObject`
+            Spatial object providing the directions, usually Source or Emitter
+        ref_object : :class:`sofa.spatial.SpatialObject`, optional
+            Spatial object providing the reference system, usually Listener
+        resolution : float or tuple of float, optional
+            Grid resolution in degree, or tuple of (azimuth, elevation) resolution
+        interpolate : bool, optional
+            Store the surrounding triangle vertices instead of the nearest direction
+        indices : dict(key:str, value:int or slice), optional
+            Key: dimension name, value: indices to be used, must leave a single dimension besides "C"
+
+        Returns
+        -------
+        lookup : :class:`sofa.spatial.DirectionLookup`
+        """
+        triangulation = spatial_object.get_triangulation(ref_object, indices) if interpolate else None
+        return DirectionLookup.from_directions(spatial_object.get_relative_directions(ref_object, indices),
+                                               resolution, triangulation)
+
+    @staticmethod
+    def load(path, mmap_mode="r"):
+        """Load a lookup table saved with :func:`save`
+
+        Parameters
+        ----------
+        path : str
+            Relative or absolute path to .npy file
+        mmap_mode : str, optional
+            Memory-map mode passed on to :func:`numpy.load`, None to read the table into memory
+
+        Returns
+        -------
+        lookup : :class:`sofa.spatial.DirectionLookup`
+        """
+        return DirectionLookup(np.load(path, mmap_mode=mmap_mode))
+
+    def save(self, path):
+        """Save the table as .npy file
+
+        Parameters
+        ----------
+        path : str
+            Relative or absolute path to .npy file
+        """
+        np.save(path, self._table)
+
+    @property
+    def table(self):
+        """Measurement indices, dimensions (elevation cells, azimuth cells) or (elevation cells, azimuth cells, 3)"""
+        return self._table
+
+    @property
+    def resolution(self):
+        """Azimuth and elevation resolution in degree"""
+        return self._azimuth_resolution, self._elevation_resolution
+
+    def index(self, azimuth, elevation):
+        """Look up a single direction
+
+        Parameters
+        ----------
+        azimuth : float
+            Azimuth angle in degree
+        elevation : float
+            Elevation angle in degree
+
+        Returns
+        -------
+        index : int or np.ndarray
+            Measurement index or triangle vertex indices
+        """
+        row = min(max(int(round((elevation + 90) / self._elevation_resolution)), 0), self._elevation_cells - 1)
+        column = int(round(azimuth / self._azimuth_resolution)) % self._azimuth_cells
+        return self._cells[row * self._azimuth_cells + column]
+
+    def lookup(self, azimuth, elevation, out=None, angle_unit=None):
+        """Look up an array of directions
+
+        Temporary buffers are kept between calls, no memory is allocated for repeated queries of the same size
+        into a provided output array.
+
+        Parameters
+        ----------
+        azimuth : np.ndarray
+            Azimuth angles
+        elevation : np.ndarray
+            Elevation angles, same dimensions as azimuth
+        out : np.ndarray, optional
+            Integer array for the measurement indices, dimensions of azimuth or (azimuth dimensions..., 3)
+        angle_unit : str, optional
+            Unit of the angles, degree if not provided
+
+        Returns
+        -------
+        indices : np.ndarray
+            Measurement indices or triangle vertex indices
+        """
+        scale = 1 if angle_unit is None or Units.is_Degree(angle_unit) else 180 / np.pi
+        shape = np.shape(azimuth)
+        if out is None: out = np.empty(shape + self._table.shape[2:], dtype=self._table.dtype)
+        if self._buffers is None or self._buffers[0].shape != shape:
+            self._buffers = (np.empty(shape), np.empty(shape), np.empty(shape, dtype=np.intp))
+        rows, columns, cells = self._buffers
+
+        np.multiply(elevation, scale / self._elevation_resolution, out=rows)
+        rows += 90 / self._elevation_resolution
+        np.rint(rows, out=rows)
+        np.clip(rows, 0, self._elevation_cells - 1, out=rows)
+        rows *= self._azimuth_cells
+
+        np.multiply(azimuth, scale / self._azimuth_resolution, out=columns)
+        np.rint(columns, out=columns)
+        np.mod(columns, self._azimuth_cells, out=columns)
+
+        rows += columns
+        np.copyto(cells, rows, casting="unsafe")
+        return np.take(self._cells, cells, axis=0, out=out, mode="clip")  # cells are in range, "clip" avoids a buffer
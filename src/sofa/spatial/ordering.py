@@ -0,0 +1,137 @@
+# Copyright (c) 2019 Jannika Lossner
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""Spatial locality ordering of measurements along a space-filling curve on the sphere.
+"""
+import numpy as np
+
+from .coordinates import _unit_vectors
+
+# name of the variable holding the original measurement index after reordering
+original_index_variable = "MeasurementOriginalIndex"
+
+
+def hilbert_index(directions, order=16, system=None, angle_unit=None):
+    """Position of directions along a spherical space-filling curve
+
+    Directions are mapped onto the unit square with a cylindrical equal-area projection (azimuth, sine of the
+    elevation), which is traversed by a Hilbert curve, so that directions close on the sphere are mostly close on
+    the curve as well.
+
+    Parameters
+    ----------
+    directions : array_like
+        Directions, dimensions (..., "C")
+    order : int, optional
+        Order of the Hilbert curve, resolving a grid of 2**order x 2**order cells
+    system : str, optional
+        Coordinate system of the directions, cartesian if not provided
+    angle_unit : str, optional
+        Unit for spherical angles of the directions, degree if not provided
+
+    Returns
+    -------
+    index : np.ndarray
+        Curve index of each direction, dimensions (...)
+    """
+    if not 0 < order <= 31: raise ValueError("Hilbert curve order must be between 1 and 31")
+    p = _unit_vectors(directions, system, angle_unit)
+    n = 1 << order
+    u = np.mod(np.arctan2(p[..., 1], p[..., 0]), 2 * np.pi) / (2 * np.pi)
+    v = (np.clip(p[..., 2], -1, 1) + 1) / 2
+    x = np.minimum((u * n).astype(np.int64), n - 1)
+    y = np.minimum((v * n).astype(np.int64), n - 1)
+
+    d = np.zeros(x.shape, dtype=np.int64)
+    s = n >> 1
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        d += s * s * ((3 * rx) ^ ry)
+        # rotate quadrant
+        flip = ~ry & rx
+        x = np.where(flip, n - 1 - x, x)
+        y = np.where(flip, n - 1 - y, y)
+        x, y = np.where(~ry, y, x), np.where(~ry, x, y)
+        s >>= 1
+    return d
+
+
+def spatial_order(directions, order=16, system=None, angle_unit=None):
+    """Permutation sorting directions along a spherical space-filling curve, see :func:`hilbert_index`
+
+    Returns
+    -------
+    permutation : np.ndarray
+        Indices of the directions in curve order
+    """
+    return np.argsort(hilbert_index(directions, order, system, angle_unit), kind="stable")
+
+
+def reorder_measurements(database, path, permutation=None, spatial_object=None, ref_object=None,
+                         chunk_measurements=None, block_size=None):
+    """Write a copy of a database with all measurement-dependent variables reordered along dimension M
+
+    By default, measurements are sorted along a space-filling curve of the Source directions as seen from the
+    Listener, so that measurements of neighbouring directions are stored next to each other. The original index of
+    each measurement is stored in the variable "MeasurementOriginalIndex", dimensions ("M",).
+
+    Parameters
+    ----------
+    database : :class:`sofa.Database`
+        Source database
+    path : str
+        Relative or absolute path of the new .sofa file
+    permutation : array_like, optional
+        Original measurement index for each new measurement, determined by :func:`spatial_order` if not provided
+    spatial_object : :class:`sofa.spatial.SpatialObject`, optional
+        Spatial object providing the directions, Source if not provided
+    ref_object : :class:`sofa.spatial.SpatialObject`, optional
+        Spatial object providing the reference system, Listener if not provided
+    chunk_measurements : int, optional
+        Chunk size along dimension M of the new variables, so that neighbouring directions share storage chunks
+    block_size : int, optional
+        Number of measurements copied at once, determined from the variable size if not provided
+
+    Returns
+    -------
+    reordered : :class:`sofa.Database`
+        New database
+    """
+    from .. import _derive
+
+    if permutation is None:
+        if spatial_object is None: spatial_object = database.Source
+        if ref_object is None: ref_object = database.Listener
+        directions = spatial_object.Position.get_relative_values(ref_object, dim_order=("M", "C"), system="cartesian")
+        if len(directions) != database.Dimensions.M:
+            raise ValueError("{0} positions do not vary along dimension M".format(spatial_object.name))
+        permutation = spatial_order(directions)
+    permutation = np.asarray(permutation)
+    if not np.array_equal(np.sort(permutation), np.arange(database.Dimensions.M)):
+        raise ValueError("permutation must contain each measurement index exactly once")
+
+    reordered = _derive.create_derived(database, path, chunk_measurements=chunk_measurements)
+    _derive.copy_variables(database, reordered, measurements=permutation, block_size=block_size)
+    if original_index_variable not in database.Variables.list_variables():
+        var = reordered.Variables.create_variable(original_index_variable, ("M",), data_type="i8")
+        var.set_values(permutation)
+    return reordered
@@ -0,0 +1,175 @@
+# Copyright (c) 2019 Jannika Lossner
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""Spatial resampling of measurements onto a new grid of source directions.
+"""
+import numpy as np
+
+from .coordinates import System, _get_object_transform, _unit_vectors
+from . import harmonics
+
+methods = ["nearest", "barycentric", "sh"]
+
+
+def _target_directions(database, positions, system, angle_unit):
+    """Directions of global Source positions as seen from a Listener that is fixed for all measurements"""
+    for descriptor in ["Position", "View", "Up"]:
+        coordinates = database.Listener.__getattribute__(descriptor)
+        if coordinates.exists() and "M" in coordinates.dimensions():
+            raise ValueError("cannot resample measurements with varying Listener{0}".format(descriptor))
+    positions = np.asarray(positions, dtype=float)
+    if system is not None and system != System.Cartesian:
+        positions = System.convert(positions, ("M", "C"), system, System.Cartesian,
+                                   angle_unit if angle_unit is not None else database.Source.Position.Units)
+    listener_transform, _ = _get_object_transform(database.Listener)
+    return _unit_vectors(listener_transform(positions, True))
+
+
+def interpolation_weights(database, positions, method="barycentric", system=None, angle_unit=None, order=None,
+                          regularization=1e-2):
+    """Measurements and weights interpolating the data at the given Source positions
+
+    Parameters
+    ----------
+    database : :class:`sofa.Database`
+        Database with Source positions varying along M and a fixed Listener
+    positions : array_like
+        Global Source positions to interpolate, dimensions ("M", "C")
+    method : str, optional
+        Interpolation method, see :data:`methods`
+    system : str, optional
+        Coordinate system of the positions, system of Source.Position if not provided
+    angle_unit : str, optional
+        Unit for spherical angles of the positions, unit of Source.Position if not provided
+    order : int, optional
+        Spherical harmonic order for method "sh", largest order supported by the number of measurements if not provided
+    regularization : float, optional
+        Tikhonov regularization of the spherical harmonic decomposition for method "sh"
+
+    Returns
+    -------
+    measurements, weights : np.ndarray, np.ndarray
+        Measurement indices and their weights, dimensions (positions, k), k being all measurements for method "sh"
+    """
+    if system is None: system = database.Source.Position.Type
+    targets = _target_directions(database, positions, system, angle_unit)
+    if method == "nearest":
+        from scipy.spatial import cKDTree
+        _, measurements = cKDTree(database.Source.get_relative_directions(database.Listener)).query(targets)
+        return measurements[:, None], np.ones((len(targets), 1))
+    if method == "barycentric":
+        return database.Source.get_triangulation(database.Listener).interpolation_weights(targets)
+    if method == "sh":
+        directions = database.Source.get_relative_directions(database.Listener)
+        if order is None: order = int(np.sqrt(len(directions))) - 1
+        weights = harmonics.sh_basis(targets, order) @ harmonics.decomposition_matrix(directions, order, regularization)
+        return np.broadcast_to(np.arange(len(directions)), weights.shape), weights
+    raise ValueError("unknown interpolation method {0}, use one of {1}".format(method, methods))
+
+
+def resample(database, path, positions, method="barycentric", system=None, angle_unit=None, block_size=None,
+             order=None, regularization=1e-2):
+    """Write a new database of the same convention with the measurements interpolated at new Source positions
+
+    Numeric Data variables varying along M are interpolated, all other variables varying along M are taken from the
+    measurement with the largest interpolation weight. Measurements are processed in blocks of target positions.
+
+    Parameters
+    ----------
+    database : :class:`sofa.Database`
+        Database with Source positions varying along M and a fixed Listener
+    path : str
+        Relative or absolute path of the new .sofa file
+    positions : array_like
+        Global Source positions of the new measurements, dimensions ("M", "C")
+    method : str, optional
+        Interpolation method, see :data:`methods`
+    system : str, optional
+        Coordinate system of the positions, system of Source.Position if not provided
+    angle_unit : str, optional
+        Unit for spherical angles of the positions, unit of Source.Position if not provided
+    block_size : int, optional
+        Number of new measurements computed at once, determined from the variable size if not provided
+    order : int, optional
+        Spherical harmonic order for method "sh", largest order supported by the number of measurements if not provided
+    regularization : float, optional
+        Tikhonov regularization of the spherical harmonic decomposition for method "sh"
+
+    Returns
+    -------
+    resampled : :class:`sofa.Database`
+        New database
+    """
+    from .. import _derive
+
+    if "M" not in database.Source.Position.dimensions():
+        raise ValueError("cannot resample measurements with fixed Source Position")
+    positions = np.asarray(positions, dtype=float)
+    measurements, weights = interpolation_weights(database, positions, method, system, angle_unit, order,
+                                                  regularization)
+    nearest = measurements[np.arange(len(measurements)), np.argmax(weights, axis=1)]
+
+    resampled = _derive.create_derived(database, path, dimensions={"M": len(positions)})
+    history = database.Metadata.get_attribute("History")
+    resampled.Metadata.set_attribute("History", (history + "\n" if history else "") +
+                                     "{0} interpolation to {1} source positions".format(method, len(positions)))
+
+    interpolated = []
+    for name in resampled.Variables.list_variables():
+        var = database.dataset[name]
+        if name == database.Source.Position.name: continue
+        if "M" not in var.dimensions:
+            _derive.copy_variables(database, resampled, [name])
+        elif name.startswith("Data.") and var.dimensions[0] == "M" and np.issubdtype(var.dtype, np.floating):
+            interpolated.append(name)
+        else:
+            _derive.copy_variables(database, resampled, [name], measurements=nearest, block_size=block_size)
+    resampled.Source.Position.set_values(positions, system=system, angle_unit=angle_unit)
+
+    for name in interpolated:
+        source = database.dataset[name]
+        target = resampled.dataset[name]
+        if method == "sh":
+            _resample_dense(source, target, weights, block_size)
+            continue
+        size = block_size
+        if size is None: size = max(1, _derive.measurement_block_size(source) // measurements.shape[1])
+        for start in range(0, len(positions), size):
+            stop = min(start + size, len(positions))
+            values = _derive.read_measurements(source, measurements[start:stop].ravel())
+            values = values.reshape((stop - start, measurements.shape[1]) + values.shape[1:])
+            target[start:stop] = np.einsum("qk,qk...->q...", weights[start:stop], values)
+    return resampled
+
+
+def _resample_dense(source, target, weights, block_size):
+    """Weighted sums over all measurements, accumulated over blocks of the source measurements"""
+    from .. import _derive, access
+
+    size = block_size if block_size is not None else _derive.measurement_block_size(source)
+    for start in range(0, len(weights), size):
+        stop = min(start + size, len(weights))
+        values = 0
+        for block in range(0, source.shape[0], size):
+            end = min(block + size, source.shape[0])
+            values = values + np.einsum("qm,m...->q...", weights[start:stop, block:end],
+                                         access.read_selection(source, slice(block, end)))
+        target[start:stop] = values
@@ -20,6 +20,8 @@
 
 from .. import access
 from .coordinates import *
+from .coordinates import _unit_vectors
+from .triangulation import Triangulation
 import numpy as np
 
 
@@ -28,22 +30,29 @@ class SpatialObject(access.ProxyObject):
 
     def __init__(self, database, name):
         super().__init__(database, name)
+        self._Position = None
+        self._View = None
+        self._Up = None
+        self._pose_cache = dict()
         return
 
     @property
     def Position(self):
         """Position of the spatial object relative to its reference system"""
-        return Coordinates(self, "Position")
+        if self._Position is None: self._Position = Coordinates(self, "Position")
+        return self._Position
 
     @property
     def View(self):
         """View (x-axis) of the spatial object relative to its reference system"""
-        return Coordinates(self, "View")
+        if self._View is None: self._View = Coordinates(self, "View")
+        return self._View
 
     @property
     def Up(self):
         """Up (z-axis) of the spatial object relative to its reference system"""
-        return Coordinates(self, "Up")
+        if self._Up is None: self._Up = Coordinates(self, "Up")
+        return self._Up
 
     @property
     def Type(self):
@@ -109,7 +118,7 @@ class SpatialObject(access.ProxyObject):
             var = self.__getattribute__(c)
             if not var.exists(): var.initialize(c in variances)
 
-    def get_pose(self, indices=None, dim_order=None, system=None, angle_unit=None):
+    def get_pose(self, indices=None, dim_order=None, system=None, angle_unit=None, chunk_size=None, workers=None):
         """ Gets the spatial object coordinates or their defaults if they have not been defined. Relative spatial objects return their global pose, or their reference object's pose values if theirs are undefined.
 
         Parameters
@@ -122,6 +131,10 @@ class SpatialObject(access.ProxyObject):
             Target coordinate system
         angle_unit : str, optional
             Unit for spherical angles in the output arrays
+        chunk_size : int, optional
+            Transform chunks of this many measurements on a thread pool, bounding the size of temporary arrays
+        workers : int, optional
+            Number of worker threads for chunked transforms
 
         Returns
         -------
@@ -131,12 +144,13 @@ class SpatialObject(access.ProxyObject):
         """
 
         if angle_unit is None: angle_unit = "rad"
+        coordinates = [self.Position, self.View, self.Up]
         anchor = self.Position.get_global_reference_object()
         if anchor is None:  # this is an object in the global coordinate system
-            default_order = ("I", "C")
-            position = np.asarray([[0, 0, 0]])
-            view = np.asarray([[1, 0, 0]])
-            up = np.asarray([[0, 0, 1]])
+            defaults = [self._get_default_pose(c._descriptor, dim_order, system, angle_unit) for c in coordinates]
+
+        elif all(c.exists() for c in coordinates):
+            defaults = [None, None, None]
 
         else:  # this is an object defined relative to another
             ldim = self.Position.get_local_dimension()
@@ -146,35 +160,80 @@ class SpatialObject(access.ProxyObject):
             default_order = (ldim,) + anchor_order
             if dim_order is None: dim_order = access.get_default_dimension_order(self.Position.dimensions(), indices)
 
-            anchor_position, anchor_view, anchor_up = anchor.get_pose(indices=indices, dim_order=anchor_order,
-                                                                      system=System.Cartesian)
-            position = np.repeat(np.expand_dims(anchor_position, 0), lcount, axis=0)
-            view = np.repeat(np.expand_dims(anchor_view, 0), lcount, axis=0)
-            up = np.repeat(np.expand_dims(anchor_up, 0), lcount, axis=0)
+            # broadcast the anchor pose along the local dimension as read-only views instead of repeated copies
+            anchor_pose = anchor.get_pose(indices=indices, dim_order=anchor_order, system=System.Cartesian)
+            defaults = [access.get_values_from_array(
+                System.convert(np.broadcast_to(np.expand_dims(values, 0), (lcount,) + values.shape), default_order,
+                               System.Cartesian, system, angle_unit, angle_unit),
+                default_order, dim_order=dim_order) for values in anchor_pose]
 
         # get existing values or use defaults
-        if self.Position.exists():
-            position = self.Position.get_global_values(indices, dim_order, system, angle_unit)
-        else:
-            position = access.get_values_from_array(
-                System.convert(position, default_order, System.Cartesian, system, angle_unit,
-                                           angle_unit),
-                default_order, dim_order=dim_order)
+        position, view, up = [c.get_global_values(indices, dim_order, system, angle_unit, chunk_size=chunk_size,
+                                                  workers=workers) if c.exists() else default
+                              for c, default in zip(coordinates, defaults)]
+        return position, view, up
 
-        if self.View.exists():
-            view = self.View.get_global_values(indices, dim_order, system, angle_unit)
-        else:
-            view = access.get_values_from_array(
-                System.convert(view, default_order, System.Cartesian, system, angle_unit,
-                                           angle_unit),
+    def _get_default_pose(self, descriptor, dim_order, system, angle_unit):
+        """Default Position, View or Up of a global object, shared as read-only array per requested layout"""
+        key = (descriptor, None if dim_order is None else tuple(dim_order), system, angle_unit)
+        if key not in self._pose_cache:
+            default_order = ("I", "C")
+            values, default_system = Coordinates.default_values[descriptor]
+            values = access.get_values_from_array(
+                System.convert(np.asarray([values]), default_order, default_system, system, angle_unit, angle_unit),
                 default_order, dim_order=dim_order)
+            values.flags.writeable = False
+            self._pose_cache[key] = values
+        return self._pose_cache[key]
+
+    def get_relative_directions(self, ref_object=None, indices=None, orientations=None, orientation_unit=None):
+        """Directions of the object positions as seen from a reference object
+
+        Parameters
+        ----------
+        ref_object : :class:`sofa.spatial.SpatialObject`, optional
+            Spatial object providing the reference system, global reference system if not provided
+        indices : dict(key:str, value:int or slice), optional
+            Key: dimension name, value: indices to be used, must leave a single dimension besides "C"
+        orientations : array_like, optional
+            Head orientations applied to the reference object, see :func:`sofa.spatial.Coordinates.get_rotated_values`
+        orientation_unit : str, optional
+            Unit of the orientation angles, degree if not provided
 
-        if self.Up.exists():
-            up = self.Up.get_global_values(indices, dim_order, system, angle_unit)
+        Returns
+        -------
+        directions : np.ndarray
+            Cartesian unit vectors, dimensions (M|R|E, C), or (orientations, M|R|E, C) if orientations are provided
+        """
+        if orientations is None:
+            values = self.Position.get_relative_values(ref_object, indices=indices, system=System.Cartesian)
         else:
-            up = access.get_values_from_array(
-                System.convert(up, default_order, System.Cartesian, system, angle_unit,
-                                           angle_unit),
-                default_order, dim_order=dim_order)
+            values = self.Position.get_rotated_values(orientations, ref_object, indices=indices,
+                                                      system=System.Cartesian, orientation_unit=orientation_unit)
+        if values.ndim != (2 if orientations is None else 3):
+            raise ValueError("{0} positions have dimensions {1}, provide indices to select a single set of "
+                             "directions".format(self.name, values.shape))
+        return _unit_vectors(values)
+
+    def get_triangulation(self, ref_object=None, indices=None):
+        """Spherical triangulation of the object positions as seen from a reference object, e.g.
+        `database.Source.get_triangulation(database.Listener)` for the measurement directions of an HRTF set.
+        The triangulation is cached by the database until object positions are changed.
 
-        return position, view, up
+        Parameters
+        ----------
+        ref_object : :class:`sofa.spatial.SpatialObject`, optional
+            Spatial object providing the reference system, global reference system if not provided
+        indices : dict(key:str, value:int or slice), optional
+            Key: dimension name, value: indices to be used, must leave a single dimension besides "C"
+
+        Returns
+        -------
+        triangulation : :class:`sofa.spatial.Triangulation`
+        """
+        key = ("Triangulation", self.name, None if ref_object is None else ref_object.name,
+               None if indices is None else tuple(sorted((k, str(v)) for k, v in indices.items())))
+        cache = self.database._spatial_cache
+        if key not in cache:
+            cache[key] = Triangulation(self.get_relative_directions(ref_object, None if indices is None else dict(indices)))
+        return cache[key]
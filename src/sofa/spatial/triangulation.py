@@ -0,0 +1,171 @@
+# Copyright (c) 2019 Jannika Lossner
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""Spherical triangulation of measurement directions for barycentric (VBAP-style) interpolation.
+"""
+import numpy as np
+from scipy.spatial import ConvexHull, cKDTree
+
+from .coordinates import _unit_vectors
+
+
+class Triangulation:
+    """Spherical Delaunay triangulation of a set of directions, given by their convex hull
+
+    Directions are located with a k-d tree of the triangulation vertices, so that only the triangles adjacent to
+    the nearest vertices of a query direction are tested instead of all triangles.
+
+    Parameters
+    ----------
+    directions : array_like
+        Vertex directions, dimensions ("M", "C")
+    system : str, optional
+        Coordinate system of the directions, cartesian if not provided
+    angle_unit : str, optional
+        Unit for spherical angles of the directions, degree if not provided
+    """
+
+    def __init__(self, directions, system=None, angle_unit=None):
+        self._vertices = _unit_vectors(directions, system, angle_unit)
+        if len(self._vertices) < 4: raise ValueError("triangulation requires at least 4 directions")
+        self._simplices = ConvexHull(self._vertices).simplices
+
+        # barycentric weights g of a direction p in triangle L (vertices as rows) follow from p = g L
+        # faces through the origin (e.g. missing hemispheres) are singular, their pseudo-inverse is used instead
+        self._inverses = np.linalg.pinv(self._vertices[self._simplices])
+
+        # point location: nearest vertices and the triangles adjacent to them
+        self._tree = cKDTree(self._vertices)
+        vertex_ids = self._simplices.ravel()
+        triangle_ids = np.repeat(np.arange(len(self._simplices)), 3)
+        order = np.argsort(vertex_ids, kind="stable")
+        counts = np.bincount(vertex_ids, minlength=len(self._vertices))
+        adjacency = np.full((len(self._vertices), max(counts.max(), 1)), -1, dtype=int)
+        positions = np.arange(len(vertex_ids)) - np.repeat(np.cumsum(counts) - counts, counts)
+        adjacency[vertex_ids[order], positions] = triangle_ids[order]
+        self._adjacency = adjacency
+
+    @property
+    def vertices(self):
+        """Cartesian unit vectors of the triangulation vertices, dimensions ("M", "C")"""
+        return self._vertices
+
+    @property
+    def simplices(self):
+        """Vertex indices of the triangles, dimensions (triangles, 3)"""
+        return self._simplices
+
+    def find_triangles(self, directions, system=None, angle_unit=None, candidates=3, block_size=4096,
+                       tolerance=1e-9):
+        """Locate the triangles containing the given directions
+
+        Parameters
+        ----------
+        directions : array_like
+            Query directions, dimensions ("C",) or (..., "C")
+        system : str, optional
+            Coordinate system of the directions, cartesian if not provided
+        angle_unit : str, optional
+            Unit for spherical angles of the directions, degree if not provided
+        candidates : int, optional
+            Number of nearest vertices whose adjacent triangles are tested before falling back to a full search
+        block_size : int, optional
+            Number of directions processed at once, bounds the size of temporary arrays
+        tolerance : float, optional
+            Tolerance for directions located on triangle edges
+
+        Returns
+        -------
+        triangles, weights : np.ndarray, np.ndarray
+            Index of the containing triangle, dimensions (...), and the barycentric weights of its vertices, dimensions (..., 3)
+
+        Notes
+        -----
+        Grids that do not enclose the origin, e.g. a spherical cap, do not cover all directions. Directions outside
+        the grid are extrapolated from the closest triangle with negative weights clipped, or from the nearest vertex.
+        """
+        p = _unit_vectors(directions, system, angle_unit)
+        shape = p.shape[:-1]
+        p = p.reshape(-1, 3)
+        triangles = np.empty(len(p), dtype=int)
+        weights = np.empty((len(p), 3))
+        candidates = min(candidates, len(self._vertices))
+
+        for start in range(0, len(p), block_size):
+            block = p[start:start + block_size]
+            _, nearest = self._tree.query(block, k=candidates)
+            tris = self._adjacency[nearest.reshape(len(block), -1)].reshape(len(block), -1)
+            valid = tris >= 0
+            tris = np.where(valid, tris, 0)
+            g = np.einsum("qc,qtcv->qtv", block, self._inverses[tris])
+            inside = valid & (g.min(axis=-1) >= -tolerance)
+
+            first = np.argmax(inside, axis=1)
+            rows = np.arange(len(block))
+            block_triangles = tris[rows, first]
+            block_weights = g[rows, first]
+
+            # rare misses (e.g. queries close to faces spanning large gaps) are resolved against all triangles
+            missed = np.flatnonzero(~inside[rows, first])
+            if len(missed):
+                g_all = np.einsum("qc,tcv->qtv", block[missed], self._inverses)
+                best = np.argmax(g_all.min(axis=-1), axis=1)
+                block_triangles[missed] = best
+                block_weights[missed] = g_all[np.arange(len(missed)), best]
+
+            # directions outside all triangles are extrapolated by clipping negative weights, or taken from the
+            # nearest vertex if no positive weight remains
+            np.clip(block_weights, 0, None, out=block_weights)
+            total = block_weights.sum(axis=-1)
+            empty = np.flatnonzero(total <= 0)
+            if len(empty):
+                vertices = nearest.reshape(len(block), -1)[empty, 0]
+                block_triangles[empty] = self._adjacency[vertices, 0]
+                block_weights[empty] = self._simplices[block_triangles[empty]] == vertices[:, None]
+                total[empty] = 1
+            block_weights /= total[:, None]
+
+            triangles[start:start + len(block)] = block_triangles
+            weights[start:start + len(block)] = block_weights
+
+        return triangles.reshape(shape), weights.reshape(shape + (3,))
+
+    def interpolation_weights(self, directions, system=None, angle_unit=None, **kwargs):
+        """Barycentric interpolation weights of the triangle vertices surrounding the given directions
+
+        Parameters
+        ----------
+        directions : array_like
+            Query directions, dimensions ("C",) or (..., "C")
+        system : str, optional
+            Coordinate system of the directions, cartesian if not provided
+        angle_unit : str, optional
+            Unit for spherical angles of the directions, degree if not provided
+        kwargs
+            Further arguments passed on to :func:`find_triangles`
+
+        Returns
+        -------
+        indices, weights : np.ndarray, np.ndarray
+            Vertex (measurement) indices and their weights summing up to 1, dimensions (..., 3)
+        """
+        triangles, weights = self.find_triangles(directions, system, angle_unit, **kwargs)
+        return self._simplices[triangles], weights